@@ -4,6 +4,21 @@ import { useParams, useNavigate } from "react-router-dom";
 import api from "../services/api";
 import { ChevronDownIcon, SunIcon, MoonIcon, ArrowRightOnRectangleIcon } from "@heroicons/react/24/outline";
 
+// Streaming verification: frames are downscaled to this long side and
+// sent one at a time, the next one after each server reply
+const STREAM_MAX_SIDE = 640;
+const STREAM_FRAME_INTERVAL_MS = 150;
+const STREAM_HINTS = {
+  no_face: "No face detected. Look at the camera.",
+  multiple_faces: "Only the student should be in frame.",
+  too_small: "Move closer to the camera.",
+  low_confidence: "Face the camera directly.",
+  moving: "Hold still...",
+  blurry: "Hold still, image is blurry.",
+  mismatch: "Checking again...",
+  bad_frame: "Retrying...",
+};
+
 export default function GuardVerifyFace() {
   const { studentId, requestId } = useParams();
   const navigate = useNavigate();
@@ -11,6 +26,7 @@ export default function GuardVerifyFace() {
 
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
+  const wsRef = useRef(null);
 
   const [status, setStatus] = useState("");
   const [isVerifying, setIsVerifying] = useState(false);
@@ -25,6 +41,7 @@ export default function GuardVerifyFace() {
 
   useEffect(() => {
   return () => {
+    closeStream();
     stopCamera(); // 🔥 cleanup on unmount
   };
   }, []);
@@ -76,51 +93,94 @@ export default function GuardVerifyFace() {
   };
 
 
-  const captureAndVerify = async () => {
+  // ✅ Streaming verification: low-res frames over a WebSocket,
+  // the server answers as soon as it is confident
+  const sendFrame = () => {
+    const ws = wsRef.current;
+    const video = videoRef.current;
+    const canvas = canvasRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN || !video?.srcObject) return;
+
+    const scale = Math.min(1, STREAM_MAX_SIDE / Math.max(video.videoWidth, video.videoHeight));
+    canvas.width = Math.round(video.videoWidth * scale);
+    canvas.height = Math.round(video.videoHeight * scale);
+    canvas.getContext("2d").drawImage(video, 0, 0, canvas.width, canvas.height);
+    canvas.toBlob(
+      (blob) => {
+        if (blob && ws.readyState === WebSocket.OPEN) ws.send(blob);
+      },
+      "image/jpeg",
+      0.85
+    );
+  };
+
+  const closeStream = () => {
+    if (wsRef.current) {
+      wsRef.current.onclose = null;
+      wsRef.current.close();
+      wsRef.current = null;
+    }
+  };
+
+  const captureAndVerify = () => {
     if (!videoRef.current?.srcObject)
         return alert("Please start the camera first");
 
     setIsVerifying(true);
-    setStatus("Capturing & Verifying...");
+    setStatus("Verifying... look at the camera");
 
-    const ctx = canvasRef.current.getContext("2d");
-    // ✅ USE REAL VIDEO RESOLUTION (IMPORTANT)
-    const video = videoRef.current;
-    const canvas = canvasRef.current;
-    const w = video.videoWidth;
-    const h = video.videoHeight;
-    canvas.width = w;
-    canvas.height = h;
-    ctx.drawImage(video, 0, 0, w, h);
-    const image_b64 = canvasRef.current
-        .toDataURL("image/jpeg")
-        .split(",")[1];
+    const wsBase = api.defaults.baseURL.replace(/^http/, "ws");
+    const token = localStorage.getItem("access_token") || "";
+    const ws = new WebSocket(
+      `${wsBase}/face/verify/stream?user_id=${encodeURIComponent(studentId)}&token=${encodeURIComponent(token)}`
+    );
+    wsRef.current = ws;
 
-    try {
-        const res = await api.post("/face/verify", {
-        user_id: studentId,
-        image_b64,
-        });
+    ws.onopen = () => sendFrame();
 
-        if (res.data.data?.verified === true) {
+    ws.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
 
+      if (msg.type === "progress") {
+        setStatus(STREAM_HINTS[msg.reason] || "Verifying...");
+        setTimeout(sendFrame, STREAM_FRAME_INTERVAL_MS);
+        return;
+      }
+
+      closeStream();
+      setIsVerifying(false);
+
+      if (msg.type === "result" && msg.verified === true) {
         setStatus("Face verified successfully!");
 
         // ✅ Enable LEFT button in dashboard
         localStorage.setItem(`face_verified_${requestId}`, "true");
 
-        
         stopCamera();
         setTimeout(() => navigate("/guard"), 800);
-        } else {
-        setStatus("Face mismatch. Access Denied.");
-        }
-    } catch(err) {
-        const msg =err.response?.data?.detail ||err.response?.data?.message ||"Verification failed";
-        setStatus(msg);
-    } finally {
-        setIsVerifying(false);
-    }
+      } else if (msg.type === "result") {
+        setStatus(
+          msg.reason === "ambiguous"
+            ? "Identity ambiguous (Twin or spoof detected)"
+            : msg.reason === "timeout"
+            ? "Could not get a clear face. Please try again."
+            : "Face mismatch. Access Denied."
+        );
+      } else {
+        setStatus(msg.message || "Verification failed");
+      }
+    };
+
+    ws.onerror = () => {
+      closeStream();
+      setStatus("Verification failed");
+      setIsVerifying(false);
+    };
+
+    ws.onclose = () => {
+      wsRef.current = null;
+      setIsVerifying(false);
+    };
   };
 
 
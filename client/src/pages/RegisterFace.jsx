@@ -3,16 +3,36 @@ import Webcam from "react-webcam";
 import { useNavigate } from "react-router-dom";
 import api from "../services/api";
 
+/* Live framing guidance: small frames, one request in flight at a time */
+const FRAME_CHECK_MAX_SIDE = 640;
+const FRAME_CHECK_INTERVAL_MS = 300;
+
+const frameBlob = (canvas) =>
+  new Promise((resolve) => {
+    const f = Math.min(1, FRAME_CHECK_MAX_SIDE / Math.max(canvas.width, canvas.height));
+    let src = canvas;
+    if (f < 1) {
+      src = document.createElement("canvas");
+      src.width = Math.round(canvas.width * f);
+      src.height = Math.round(canvas.height * f);
+      src.getContext("2d").drawImage(canvas, 0, 0, src.width, src.height);
+    }
+    src.toBlob(resolve, "image/jpeg", 0.8);
+  });
+
 export default function RegisterFace() {
   const webcamRef = useRef(null);
   const navigate = useNavigate();
 
   const [imgSrc, setImgSrc] = useState(null);
+  const [imgBlob, setImgBlob] = useState(null);
   const [loading, setLoading] = useState(false);
   const [cameraReady, setCameraReady] = useState(false);
   const [permission, setPermission] = useState("prompt");
   const [error, setError] = useState("");
   const [toast, setToast] = useState(null);
+  // Last /face/frame-check reply; null while unknown or if the check is unavailable
+  const [frame, setFrame] = useState(null);
 
   const userId = localStorage.getItem("userId");
   const userType = localStorage.getItem("role") || "STUDENT";
@@ -76,6 +96,38 @@ export default function RegisterFace() {
   }, []);
 
 
+  /* FRAMING GUIDANCE (until a photo is captured) */
+  useEffect(() => {
+    if (!cameraReady || imgSrc) return;
+    let active = true;
+
+    const loop = async () => {
+      while (active) {
+        const started = Date.now();
+        const canvas = webcamRef.current?.getCanvas();
+        const blob = canvas && (await frameBlob(canvas));
+        if (blob && active) {
+          try {
+            const res = await api.post("/face/frame-check", blob, {
+              headers: { "Content-Type": "image/jpeg" },
+            });
+            if (active) setFrame(res.data?.data || null);
+          } catch {
+            // Guidance is best effort: never block capture on it
+            if (active) setFrame(null);
+          }
+        }
+        const wait = FRAME_CHECK_INTERVAL_MS - (Date.now() - started);
+        await new Promise((r) => setTimeout(r, Math.max(wait, 0)));
+      }
+    };
+    loop();
+
+    return () => {
+      active = false;
+    };
+  }, [cameraReady, imgSrc]);
+
   const requestCamera = async () => {
     setError("");
     try {
@@ -100,21 +152,36 @@ export default function RegisterFace() {
 
   const capture = useCallback(() => {
     if (!cameraReady) return;
-    const imageSrc = webcamRef.current?.getScreenshot();
-    if (!imageSrc) return;
-    setImgSrc(imageSrc);
+    const canvas = webcamRef.current?.getCanvas();
+    if (!canvas) return;
+    // ✅ Binary JPEG: uploaded as-is, previewed via an object URL
+    canvas.toBlob(
+      (blob) => {
+        if (!blob) return;
+        setImgBlob(blob);
+        setImgSrc(URL.createObjectURL(blob));
+      },
+      "image/jpeg",
+      0.92
+    );
   }, [cameraReady]);
 
+  const retake = () => {
+    if (imgSrc) URL.revokeObjectURL(imgSrc);
+    setImgSrc(null);
+    setImgBlob(null);
+    setFrame(null);
+  };
+
   const handleUpload = async () => {
-    if (!imgSrc) return;
+    if (!imgBlob) return;
     setLoading(true);
     setError("");
 
     try {
-      await api.post("/face/register", {
-        user_id: userId,
-        user_type: userType,
-        image_b64: imgSrc.split(",")[1],
+      await api.post("/face/register", imgBlob, {
+        params: { user_id: userId, user_type: userType },
+        headers: { "Content-Type": "image/jpeg" },
       });
 
       localStorage.setItem("face_id", "PRESENT");
@@ -188,7 +255,15 @@ export default function RegisterFace() {
 
         {permission === "granted" && (
           <>
-            <div className="aspect-square rounded-2xl overflow-hidden border-4 border-indigo-500 mb-4">
+            <div
+              className={`aspect-square rounded-2xl overflow-hidden border-4 mb-4 ${
+                imgSrc || !frame
+                  ? "border-indigo-500"
+                  : frame.ready
+                  ? "border-green-500"
+                  : "border-amber-500"
+              }`}
+            >
               {!imgSrc ? (
                 <Webcam
                   ref={webcamRef}
@@ -203,17 +278,32 @@ export default function RegisterFace() {
               )}
             </div>
 
+            {!imgSrc && frame && (
+              <p
+                className={`text-sm mb-4 ${
+                  frame.ready ? "text-green-400" : "text-amber-400"
+                }`}
+              >
+                {frame.message}
+              </p>
+            )}
+
             {!imgSrc ? (
               <button
                 onClick={capture}
-                className="w-full py-4 bg-indigo-600 rounded-xl font-bold"
+                disabled={frame && !frame.ready}
+                className={`w-full py-4 rounded-xl font-bold ${
+                  frame && !frame.ready
+                    ? "bg-indigo-400 cursor-not-allowed"
+                    : "bg-indigo-600"
+                }`}
               >
                 Capture
               </button>
             ) : (
               <div className="flex gap-4">
                 <button
-                  onClick={() => setImgSrc(null)}
+                  onClick={retake}
                   className="w-1/2 py-3 bg-gray-600 rounded-xl"
                 >
                   Retake
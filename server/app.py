@@ -1,10 +1,14 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import socket
 
 from extensions.cors import init_cors
 from services.bootstrap_service import init_bootstrap
+from data.face_vectors_repo import init_vector_store, face_vectors
+from services.face_template_cache import template_cache
+from services.face_engine import face_engines
+from utils.metrics import registry as metrics_registry
 from core.global_response import error
 from core.global_exception_handler import init_exception_handlers
 
@@ -52,7 +56,11 @@ app.include_router(admin_router, prefix="/super_admin") # Handles /super_admin/.
 # ---------------------------------------------------------
 @app.on_event("startup")
 async def on_start():
+    # Face models load in the background; see GET /ready
+    face_engines.start()
     init_bootstrap()
+    init_vector_store()
+    template_cache.watch(face_vectors)
 
     # Detect machine IP (LAN)
     hostname = socket.gethostname()
@@ -71,3 +79,19 @@ async def on_start():
 @app.get("/")
 def home():
     return {"message": "Server running"}
+
+
+@app.get("/ready")
+def ready():
+    engine = face_engines.status()
+    code = 200 if engine["state"] == "ready" else 503
+    return JSONResponse(status_code=code, content={"ready": code == 200, "face_engine": engine})
+
+
+@app.get("/metrics")
+def metrics():
+    """Face pipeline stage timings, rejections and scores (Prometheus text format)."""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,146 @@
+"""
+HNSW vs exact search: recall and latency.
+
+For each gallery size, builds the same HnswGraph the "hnsw" backend
+uses and compares it with the exact scoring path on:
+  - recall@k against exact top-k
+  - duplicate hit rate: queries are noisy copies of enrolled vectors
+    (cos ~0.8, like a re-enrollment) and must return their source first
+  - p50 / p95 query latency, for several ef values
+  - build time and graph size
+
+Synthetic unit vectors; no database or model needed. 1M x 512 float32
+needs ~2 GB for the gallery alone.
+Run from the server directory:
+    python -m benchmarks.bench_ann_recall [--sizes 10000,100000,1000000] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import Config
+from data.embedding_codec import cosine_scores
+from data.vector_store import HnswGraph
+
+
+def unit_rows(rng, n, dim, chunk=100_000):
+    out = np.empty((n, dim), dtype=np.float32)
+    for i in range(0, n, chunk):
+        m = rng.standard_normal((min(chunk, n - i), dim), dtype=np.float32)
+        m /= np.linalg.norm(m, axis=1, keepdims=True)
+        out[i:i + len(m)] = m
+    return out
+
+
+def noisy_copies(rng, rows, cos):
+    noise = unit_rows(rng, len(rows), rows.shape[1])
+    noise -= np.sum(noise * rows, axis=1, keepdims=True) * rows
+    noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+    return (cos * rows + np.sqrt(1 - cos ** 2) * noise).astype(np.float32)
+
+
+def exact_top_k(gallery, q, k):
+    scores = cosine_scores(gallery, q, "float32")
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def pct(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def bench_size(rng, n, args):
+    gallery = unit_rows(rng, n, args.dim)
+    ids = [f"vec_{i}" for i in range(n)]
+
+    random_q = unit_rows(rng, args.queries, args.dim)
+    src = rng.choice(n, args.queries, replace=False)
+    dup_q = noisy_copies(rng, gallery[src], 0.8)
+
+    # Exact path
+    exact_lat, exact_top = [], []
+    for q in random_q:
+        t0 = time.perf_counter()
+        exact_top.append(exact_top_k(gallery, q, args.k))
+        exact_lat.append(time.perf_counter() - t0)
+
+    # HNSW build
+    t0 = time.perf_counter()
+    graph = HnswGraph(args.dim, m=args.m, ef_construction=args.ef_construction)
+    graph.build(gallery, ids, ids)
+    build_s = time.perf_counter() - t0
+
+    result = {
+        "n": n,
+        "build_s": round(build_s, 2),
+        "graph_mb": round(graph.size_bytes() / 2**20, 1),
+        "exact_p50_ms": round(pct(exact_lat, 50), 3),
+        "exact_p95_ms": round(pct(exact_lat, 95), 3),
+        "ef": []
+    }
+
+    for ef in args.ef:
+        graph.set_ef(max(ef, args.k))
+        lat, hits = [], 0
+        for q, truth in zip(random_q, exact_top):
+            t0 = time.perf_counter()
+            found = graph.search(q, args.k)
+            lat.append(time.perf_counter() - t0)
+            truth_ids = {ids[i] for i in truth}
+            hits += len(truth_ids & {vid for _, vid, _ in found})
+
+        dup_hits = 0
+        for q, i in zip(dup_q, src):
+            found = graph.search(q, 1)
+            dup_hits += bool(found) and found[0][1] == ids[i]
+
+        result["ef"].append({
+            "ef": ef,
+            "recall_at_k": round(hits / (args.k * len(random_q)), 4),
+            "duplicate_hit_rate": round(dup_hits / len(dup_q), 4),
+            "p50_ms": round(pct(lat, 50), 3),
+            "p95_ms": round(pct(lat, 95), 3)
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--m", type=int, default=Config.FACE_HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=Config.FACE_HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--ef", default=f"16,32,{Config.FACE_HNSW_EF_SEARCH},128,256")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    args.ef = [int(e) for e in args.ef.split(",")]
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        r = bench_size(rng, n, args)
+        results.append(r)
+
+        print(
+            f"\nn={r['n']:,}  build={r['build_s']}s  graph={r['graph_mb']} MB  "
+            f"exact p50={r['exact_p50_ms']}ms p95={r['exact_p95_ms']}ms"
+        )
+        print(f"  {'ef':>5} {'recall@k':>9} {'dup hit':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for e in r["ef"]:
+            print(
+                f"  {e['ef']:5d} {e['recall_at_k']:9.4f} {e['duplicate_hit_rate']:8.4f} "
+                f"{e['p50_ms']:8.3f} {e['p95_ms']:8.3f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
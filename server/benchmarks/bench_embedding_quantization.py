@@ -0,0 +1,138 @@
+"""
+Quantized gallery benchmark (float32 vs float16 vs int8).
+
+Reports, per dtype:
+  - gallery memory per 100k identities
+  - full-gallery scoring throughput (queries / second)
+  - similarity drift against exact float32 on pairs whose cosine is
+    spread around VERIFY_THRESHOLD and DUPLICATE_HIGH, and how many
+    accept/reject decisions flip at each threshold
+
+Synthetic unit vectors are used, so no database or model is needed.
+Run from the server directory:
+    python -m benchmarks.bench_embedding_quantization [--n 100000] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from data.embedding_codec import GALLERY_DTYPES, quantize, cosine_scores, simsimd
+from data.vector_store import to_search_score
+from services.face_thresholds import VERIFY_THRESHOLD, DUPLICATE_HIGH
+
+
+def unit_rows(rng, n, dim):
+    m = rng.standard_normal((n, dim)).astype(np.float32)
+    m /= np.linalg.norm(m, axis=1, keepdims=True)
+    return m
+
+
+def pairs_with_cosine(rng, cos, dim):
+    """Unit vectors b with <a, b> == cos exactly (before quantization)."""
+    a = unit_rows(rng, len(cos), dim)
+    noise = unit_rows(rng, len(cos), dim)
+    noise -= np.sum(noise * a, axis=1, keepdims=True) * a
+    noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+    b = cos[:, None] * a + np.sqrt(1.0 - cos[:, None] ** 2) * noise
+    return a, b.astype(np.float32)
+
+
+def quantize_rows(rows, dtype):
+    out = np.empty(rows.shape, dtype=dtype)
+    scales = np.ones(rows.shape[0], dtype=np.float32)
+    for i, r in enumerate(rows):
+        out[i], scales[i] = quantize(r, dtype)
+    return out, scales
+
+
+def bench_dtype(dtype, gallery, queries, pair_a, pair_b, exact_cos):
+    matrix, scales = quantize_rows(gallery, dtype)
+    mem = matrix.nbytes + (scales.nbytes if dtype == "int8" else 0)
+    per_100k = mem / gallery.shape[0] * 100_000
+
+    encoded = [quantize(q, dtype)[0] for q in queries]
+    cosine_scores(matrix, encoded[0], dtype)  # warm up
+    t0 = time.perf_counter()
+    for q in encoded:
+        cosine_scores(matrix, q, dtype)
+    elapsed = time.perf_counter() - t0
+
+    qa, _ = quantize_rows(pair_a, dtype)
+    qb, _ = quantize_rows(pair_b, dtype)
+    approx = np.array([
+        cosine_scores(qb[i:i + 1], qa[i], dtype)[0] for i in range(len(qa))
+    ])
+    drift = np.abs(approx - exact_cos)
+
+    def flips(exact, approx_, threshold):
+        return int(np.sum((exact >= threshold) != (approx_ >= threshold)))
+
+    return {
+        "dtype": dtype,
+        "mb_per_100k": round(per_100k / 2**20, 2),
+        "queries_per_s": round(len(encoded) / elapsed, 1),
+        "ms_per_query": round(elapsed / len(encoded) * 1000, 3),
+        "drift_mean": float(drift.mean()),
+        "drift_p99": float(np.percentile(drift, 99)),
+        "drift_max": float(drift.max()),
+        "flips_verify_threshold": flips(exact_cos, approx, VERIFY_THRESHOLD),
+        "flips_duplicate_high_cos": flips(exact_cos, approx, DUPLICATE_HIGH),
+        "flips_duplicate_high_search": flips(
+            to_search_score(exact_cos), to_search_score(approx), DUPLICATE_HIGH
+        )
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100_000, help="gallery size")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pairs", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    gallery = unit_rows(rng, args.n, args.dim)
+    queries = unit_rows(rng, args.queries, args.dim)
+
+    # Cosines covering both thresholds in both score spaces
+    exact_cos = rng.uniform(0.2, 0.8, args.pairs).astype(np.float32)
+    pair_a, pair_b = pairs_with_cosine(rng, exact_cos, args.dim)
+
+    print(f"simsimd: {'yes' if simsimd is not None else 'NOT INSTALLED (numpy fallback)'}")
+    print(f"gallery={args.n} dim={args.dim} queries={args.queries} pairs={args.pairs}\n")
+
+    results = []
+    header = (
+        f"{'dtype':8} {'MB/100k':>8} {'q/s':>8} {'ms/q':>8} "
+        f"{'drift mean':>11} {'p99':>9} {'max':>9} {'flipV':>6} {'flipD':>6} {'flipDs':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    for dtype in GALLERY_DTYPES:
+        r = bench_dtype(dtype, gallery, queries, pair_a, pair_b, exact_cos)
+        results.append(r)
+        print(
+            f"{r['dtype']:8} {r['mb_per_100k']:8.1f} {r['queries_per_s']:8.1f} "
+            f"{r['ms_per_query']:8.3f} {r['drift_mean']:11.2e} {r['drift_p99']:9.2e} "
+            f"{r['drift_max']:9.2e} {r['flips_verify_threshold']:6d} "
+            f"{r['flips_duplicate_high_cos']:6d} {r['flips_duplicate_high_search']:6d}"
+        )
+
+    print(
+        f"\nflipV: decisions changed at VERIFY_THRESHOLD={VERIFY_THRESHOLD} (cosine)"
+        f"\nflipD: at DUPLICATE_HIGH={DUPLICATE_HIGH} as a cosine (ambiguous band edge)"
+        f"\nflipDs: at DUPLICATE_HIGH as a vector search score ((1 + cos) / 2)"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
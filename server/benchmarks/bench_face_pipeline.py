@@ -0,0 +1,375 @@
+"""
+End-to-end face pipeline benchmark with per-stage timings.
+
+Drives the same functions /face/verify uses, per request:
+  decode    decode_image (base64 → reduced-resolution frame)
+  detect    ensure_single_face (detection + landmarks + recognition)
+  extract   extract_embedding_and_landmarks (incl. the full-resolution
+            fallback for small faces)
+  score     cosine + landmark distance, the math of match_template
+  search_*  one search per gallery backend (local, hnsw: in-memory
+            synthetic galleries; live: search_similar_faces against the
+            configured backend and database)
+
+at several resolutions and concurrency levels, and reports p50 / p95 /
+p99 per stage, requests / second and peak RSS.
+
+Synthetic frames contain no face, so detect only measures the detector
+(extract is skipped); pass --images with face photos for the full
+pipeline. Fixtures are re-encoded at every resolution.
+
+--json saves a machine-readable baseline; --baseline compares a run
+with it and exits 1 when a stage's p95 grew by more than --tolerance.
+Run from the server directory:
+    python -m benchmarks.bench_face_pipeline [--images dir] [--resolutions 640x480,1920x1080]
+        [--concurrency 1,4,8] [--json baseline.json] [--baseline baseline.json]
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+
+from config import Config
+from data.embedding_codec import cosine_similarity
+from data.vector_store import LocalVectorStore, HnswVectorStore, hnswlib
+from services.face_engine import face_engines, role_profiles
+from services.face_service import (
+    decode_image,
+    ensure_single_face,
+    extract_embedding_and_landmarks,
+    landmark_distance
+)
+from services.face_thresholds import VERIFY_THRESHOLD, DUPLICATE_HIGH
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def unit_rows(rng, n, dim):
+    m = rng.standard_normal((n, dim)).astype(np.float32)
+    m /= np.linalg.norm(m, axis=1, keepdims=True)
+    return m
+
+
+def pct(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+# ==========================================================
+# INPUTS
+# ==========================================================
+def synthetic_frame(rng, w, h):
+    """Smooth blobs plus sensor-like noise: compresses like a photo."""
+    small = rng.integers(0, 256, (h // 16 + 1, w // 16 + 1, 3), dtype=np.uint8)
+    img = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(0, 24, img.shape, dtype=np.uint8)
+    return cv2.subtract(cv2.add(img, noise), 12)
+
+
+def fit(img, w, h):
+    """Fixture resized to cover w x h, center-cropped to exactly w x h."""
+    s = max(w / img.shape[1], h / img.shape[0])
+    img = cv2.resize(img, (round(img.shape[1] * s), round(img.shape[0] * s)), interpolation=cv2.INTER_AREA)
+    y0, x0 = (img.shape[0] - h) // 2, (img.shape[1] - w) // 2
+    return img[y0:y0 + h, x0:x0 + w]
+
+
+def load_fixtures(path):
+    images = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if img is not None:
+                images.append(img)
+    return images
+
+
+def encode_payloads(rng, w, h, fixtures, count, quality):
+    payloads = []
+    for i in range(len(fixtures) or count):
+        # One frame at a time: 4000x3000 frames are 36 MB each
+        img = fit(fixtures[i], w, h) if fixtures else synthetic_frame(rng, w, h)
+        _, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        payloads.append(base64.b64encode(buf.tobytes()).decode())
+    return payloads
+
+
+# ==========================================================
+# SEARCH BACKENDS
+# ==========================================================
+def in_memory_store(backend, gallery):
+    """A local / hnsw store filled like bulk_load, without a collection."""
+    cls = HnswVectorStore if backend == "hnsw" else LocalVectorStore
+    store = cls(None, follow_changes=False, snapshot_dir=None)
+    ids = [f"vec_{i}" for i in range(len(gallery))]
+    if backend == "hnsw":
+        store._graph_paused = True
+    with store._lock:
+        store._reset(max(1024, len(gallery)))
+        for vid, emb in zip(ids, gallery):
+            store._put(vid, vid, emb)
+    if backend == "hnsw":
+        store._graph_paused = False
+        store._rebuild_graph()
+    store._loaded = True
+    store._ready.set()
+    return store
+
+
+def search_backends(rng, names, gallery_size):
+    backends = {}
+    gallery = None
+    for name in names:
+        if name == "live":
+            from data.face_vectors_repo import search_similar_faces
+            backends[name] = search_similar_faces
+            continue
+        if name == "hnsw" and hnswlib is None:
+            print("❌ hnswlib not installed, skipping the hnsw backend")
+            continue
+        if name not in ("local", "hnsw"):
+            raise SystemExit(f"Unknown backend: {name}")
+        if gallery is None:
+            gallery = unit_rows(rng, gallery_size, Config.FACE_VECTOR_DIM)
+        backends[name] = in_memory_store(name, gallery).search
+    return backends
+
+
+# ==========================================================
+# PIPELINE
+# ==========================================================
+def run_request(payload, template, backends, role):
+    """
+    {stage: seconds} for one request, plus whether a face was found.
+    `role` is the model profile role, None to skip inference.
+    """
+    times = {}
+
+    t0 = time.perf_counter()
+    img, src = decode_image(payload)
+    times["decode"] = time.perf_counter() - t0
+
+    emb, lm = template
+    found = False
+    if role:
+        t0 = time.perf_counter()
+        try:
+            ensure_single_face(img, role)
+            found = True
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+        times["detect"] = time.perf_counter() - t0
+
+        if found:
+            t0 = time.perf_counter()
+            emb, lm = extract_embedding_and_landmarks(img, src, role)
+            times["extract"] = time.perf_counter() - t0
+
+    # No face: score / search a synthetic embedding so the stages still run
+    t0 = time.perf_counter()
+    score = cosine_similarity(template[0], emb)
+    if not found or VERIFY_THRESHOLD <= score < DUPLICATE_HIGH:
+        landmark_distance(lm, template[1])
+    times["score"] = time.perf_counter() - t0
+
+    for name, search in backends.items():
+        t0 = time.perf_counter()
+        search(emb, 5)
+        times[f"search_{name}"] = time.perf_counter() - t0
+
+    return times, found
+
+
+def bench_level(payloads, template, backends, inference, concurrency, requests):
+    work = [payloads[i % len(payloads)] for i in range(requests)]
+    stages, faces, errors = {}, 0, 0
+
+    def one(payload):
+        try:
+            return run_request(payload, template, backends, inference)
+        except HTTPException as e:
+            return e
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, work))
+    wall = time.perf_counter() - t0
+
+    for r in results:
+        if isinstance(r, HTTPException):
+            errors += 1
+            continue
+        times, found = r
+        faces += found
+        for stage, t in times.items():
+            stages.setdefault(stage, []).append(t)
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "faces_found": faces,
+        "throughput_rps": round(requests / wall, 2),
+        "stages": {
+            stage: {
+                "p50_ms": round(pct(t, 50), 3),
+                "p95_ms": round(pct(t, 95), 3),
+                "p99_ms": round(pct(t, 99), 3)
+            }
+            for stage, t in stages.items()
+        },
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+# ==========================================================
+# BASELINE
+# ==========================================================
+def settings(role):
+    """What a regression can be attributed to."""
+    profile = Config.FACE_MODEL_PROFILES[role_profiles()[role]]
+    return {
+        "profile": role_profiles()[role],
+        "model": profile["model"],
+        "det_size": list(profile["det_size"]),
+        "modules": list(profile.get("modules") or []),
+        "rec_file": profile.get("rec_file"),
+        "max_batch": Config.FACE_MAX_BATCH,
+        "daemon": bool(Config.FACE_DAEMON_SOCKET),
+        "decode_min_side": Config.FACE_DECODE_MIN_SIDE,
+        "min_rec_face_px": Config.FACE_MIN_REC_FACE_PX,
+        "gallery_dtype": Config.FACE_VECTOR_GALLERY_DTYPE,
+        "verify_threshold": VERIFY_THRESHOLD,
+        "duplicate_high": DUPLICATE_HIGH
+    }
+
+
+def compare(results, baseline, tolerance):
+    """[(resolution, concurrency, stage, old p95, new p95)] that regressed."""
+    old = {
+        (r["resolution"], lvl["concurrency"], stage): s["p95_ms"]
+        for r in baseline["results"]
+        for lvl in r["levels"]
+        for stage, s in lvl["stages"].items()
+    }
+    regressions = []
+    for r in results:
+        for lvl in r["levels"]:
+            for stage, s in lvl["stages"].items():
+                before = old.get((r["resolution"], lvl["concurrency"], stage))
+                if before and s["p95_ms"] > before * (1 + tolerance):
+                    regressions.append((r["resolution"], lvl["concurrency"], stage, before, s["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory of face photos (default: synthetic frames)")
+    parser.add_argument("--resolutions", default="640x480,1280x720,1920x1080,4000x3000")
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--backends", default="local,hnsw", help="local, hnsw and/or live")
+    parser.add_argument("--gallery", type=int, default=50_000, help="synthetic gallery size")
+    parser.add_argument("--quality", type=int, default=90, help="JPEG quality of the payloads")
+    parser.add_argument("--role", choices=("enroll", "gate"), default="gate", help="model profile role")
+    parser.add_argument("--no-inference", action="store_true", help="skip detect / extract")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results (a baseline) to this file")
+    parser.add_argument("--baseline", help="compare with a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth, 0.2 = +20%%")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    fixtures = load_fixtures(args.images) if args.images else []
+    if args.images and not fixtures:
+        raise SystemExit(f"No images in {args.images}")
+
+    inference = None if args.no_inference else args.role
+    if inference:
+        t0 = time.perf_counter()
+        engine = face_engines.for_role(args.role)
+        if engine.ensure_started() is None:
+            print(f"❌ Face engine unavailable ({engine.error}); detect / extract skipped")
+            inference = None
+        else:
+            print(f"✅ Face engine '{engine.profile}' ready in {time.perf_counter() - t0:.1f}s")
+
+    backends = search_backends(rng, [b for b in args.backends.split(",") if b], args.gallery)
+    template = (unit_rows(rng, 1, Config.FACE_VECTOR_DIM)[0], rng.normal(0, 50, (68, 3)).astype(np.float32))
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    for res in args.resolutions.split(","):
+        w, h = (int(v) for v in res.lower().split("x"))
+        payloads = encode_payloads(rng, w, h, fixtures, count=8, quality=args.quality)
+        # Warm up the decode path and every backend once
+        run_request(payloads[0], template, backends, inference)
+
+        r = {
+            "resolution": res,
+            "payload_kb": round(np.mean([len(p) for p in payloads]) * 3 / 4 / 1024, 1),
+            "levels": [
+                bench_level(payloads, template, backends, inference, c, args.requests)
+                for c in levels
+            ]
+        }
+        results.append(r)
+
+        print(f"\n{res}  ~{r['payload_kb']} KB/image")
+        for lvl in r["levels"]:
+            print(
+                f"  concurrency={lvl['concurrency']}  {lvl['throughput_rps']} req/s  "
+                f"faces={lvl['faces_found']}/{lvl['requests']}  errors={lvl['errors']}  "
+                f"peak RSS={lvl['peak_rss_mb']} MB"
+            )
+            print(f"    {'stage':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for stage, s in lvl["stages"].items():
+                print(f"    {stage:<14} {s['p50_ms']:9.3f} {s['p95_ms']:9.3f} {s['p99_ms']:9.3f}")
+
+    current = settings(args.role)
+    out = {
+        "args": vars(args),
+        "settings": current,
+        "inference": bool(inference),
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        changed = {
+            k: (v, current.get(k)) for k, v in baseline.get("settings", {}).items()
+            if current.get(k) != v
+        }
+        for k, (before, now) in changed.items():
+            print(f"  setting {k}: {before} → {now}")
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than the baseline (p95 +{args.tolerance:.0%}):")
+            for res, c, stage, before, now in regressions:
+                print(f"  {res} c={c} {stage}: {before:.3f} → {now:.3f} ms")
+            sys.exit(1)
+        print("\n✅ No p95 regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Face model profiles compared on the same image set.
+
+For each profile (Config.FACE_MODEL_PROFILES, or --profiles):
+  - load time and resident memory added by loading it. Profiles on the
+    same pack share sessions, so the second one adds almost nothing,
+    as in a deployment that uses both.
+  - p50 / p95 latency of detection alone and of the full analysis
+    (detection + landmarks + recognition), one frame at a time
+  - genuine / impostor accept rates at VERIFY_THRESHOLD when files are
+    named <person>_<n>.jpg
+
+and against the reference profile (the first one):
+  - detection agreement: same number of faces found on an image
+  - same-image cosine and landmark distance (same embedding space only)
+  - pairwise agreement: every image pair is scored within each profile;
+    mean |score difference| and the share of pairs that get the same
+    accept / reject decision
+
+Needs face photos; no database. Run from the server directory:
+    python -m benchmarks.bench_face_profiles --images dir [--profiles accurate,fast,gate] [--json out.json]
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from services.face_inference import FaceModels
+from services.face_thresholds import VERIFY_THRESHOLD
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def pct(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def rss_mb():
+    """Current resident set size (Linux), 0 elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return 0.0
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def load_images(path):
+    images = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if img is not None:
+                images.append((name, img))
+    return images
+
+
+def person(name):
+    stem = os.path.splitext(name)[0]
+    return stem.rsplit("_", 1)[0] if "_" in stem else stem
+
+
+# ==========================================================
+# ONE PROFILE
+# ==========================================================
+def analyze(models, img):
+    """Largest face with landmarks and embedding, as ensure_single_face asks for."""
+    faces = models.detect(img, max_num=1)
+    for face in faces:
+        for head in models.heads:
+            head.get(img, face)
+        face.embedding = models.embed([models.align(img, face)])[0].flatten()
+    return faces[0] if faces else None
+
+
+def bench_profile(name, images):
+    profile = Config.FACE_MODEL_PROFILES[name]
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    models = FaceModels.from_profile(name)
+    models.warmup()
+    load_s = time.perf_counter() - t0
+
+    det_lat, ana_lat, counts, faces = [], [], [], []
+    for _, img in images:
+        t0 = time.perf_counter()
+        counts.append(len(models.detect(img)))
+        det_lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        face = analyze(models, img)
+        ana_lat.append(time.perf_counter() - t0)
+        faces.append(face)
+
+    return {
+        "profile": name,
+        "model": profile["model"],
+        "det_size": list(profile["det_size"]),
+        "embedding": profile["embedding"],
+        "load_s": round(load_s, 2),
+        "added_rss_mb": round(rss_mb() - rss0, 1),
+        "detect_p50_ms": round(pct(det_lat, 50), 2),
+        "detect_p95_ms": round(pct(det_lat, 95), 2),
+        "analyze_p50_ms": round(pct(ana_lat, 50), 2),
+        "analyze_p95_ms": round(pct(ana_lat, 95), 2),
+        "faces_found": sum(f is not None for f in faces)
+    }, counts, faces
+
+
+# ==========================================================
+# AGREEMENT
+# ==========================================================
+def pair_scores(faces, idx):
+    emb = np.vstack([faces[i].embedding for i in idx]).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    iu = np.triu_indices(len(idx), k=1)
+    return (emb @ emb.T)[iu], iu
+
+
+def accept_rates(scores, iu, idx, names):
+    same = np.array([person(names[idx[a]]) == person(names[idx[b]]) for a, b in zip(*iu)], dtype=bool)
+    accept = scores >= VERIFY_THRESHOLD
+    return {
+        "genuine_pairs": int(same.sum()),
+        "genuine_accept": round(float(accept[same].mean()), 4) if same.any() else None,
+        "impostor_accept": round(float(accept[~same].mean()), 4) if (~same).any() else None
+    }
+
+
+def agreement(ref, other, names):
+    """ref / other: (result, counts, faces) of two profiles."""
+    (ref_r, ref_counts, ref_faces), (r, counts, faces) = ref, other
+    idx = [i for i in range(len(names)) if ref_faces[i] is not None and faces[i] is not None]
+    out = {
+        "detection_agreement": round(float(np.mean(np.equal(ref_counts, counts))), 4),
+        "common_faces": len(idx)
+    }
+    if ref_r["embedding"] == r["embedding"] and idx:
+        cos = [
+            float(np.dot(ref_faces[i].normed_embedding, faces[i].normed_embedding))
+            for i in idx
+        ]
+        # landmark_distance, on the same frame
+        lm = [
+            float(np.linalg.norm(ref_faces[i].landmark_3d_68.flatten() - faces[i].landmark_3d_68.flatten()))
+            for i in idx
+            if "landmark_3d_68" in ref_faces[i] and "landmark_3d_68" in faces[i]
+        ]
+        out["same_image_cos_min"] = round(min(cos), 4)
+        out["same_image_cos_mean"] = round(float(np.mean(cos)), 4)
+        out["landmark_distance_mean"] = round(float(np.mean(lm)), 2) if lm else None
+
+    if len(idx) > 1:
+        a, _ = pair_scores(ref_faces, idx)
+        b, _ = pair_scores(faces, idx)
+        out["pair_score_mean_abs_diff"] = round(float(np.mean(np.abs(a - b))), 4)
+        out["pair_decision_agreement"] = round(
+            float(np.mean((a >= VERIFY_THRESHOLD) == (b >= VERIFY_THRESHOLD))), 4
+        )
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of face photos")
+    parser.add_argument("--profiles", default=",".join(Config.FACE_MODEL_PROFILES))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"No images in {args.images}")
+    names = [n for n, _ in images]
+    profiles = [p for p in args.profiles.split(",") if p]
+    unknown = [p for p in profiles if p not in Config.FACE_MODEL_PROFILES]
+    if unknown:
+        raise SystemExit(f"Unknown profiles: {', '.join(unknown)}")
+
+    runs = [bench_profile(p, images) for p in profiles]
+    results = []
+    for run in runs:
+        r, _, faces = run
+        idx = [i for i, f in enumerate(faces) if f is not None]
+        if len(idx) > 1:
+            r.update(accept_rates(*pair_scores(faces, idx), idx, names))
+        if run is not runs[0]:
+            r["vs_" + runs[0][0]["profile"]] = agreement(runs[0], run, names)
+        results.append(r)
+
+    print(f"\n{len(images)} images, reference profile: {profiles[0]}")
+    print(
+        f"  {'profile':<10} {'model':<10} {'det':>9} {'load s':>7} {'+RSS MB':>8} "
+        f"{'det p50':>8} {'det p95':>8} {'ana p50':>8} {'ana p95':>8} {'faces':>6} {'TAR':>7} {'FAR':>7}"
+    )
+    for r in results:
+        print(
+            f"  {r['profile']:<10} {r['model']:<10} {'x'.join(map(str, r['det_size'])):>9} "
+            f"{r['load_s']:7.2f} {r['added_rss_mb']:8.1f} "
+            f"{r['detect_p50_ms']:8.2f} {r['detect_p95_ms']:8.2f} "
+            f"{r['analyze_p50_ms']:8.2f} {r['analyze_p95_ms']:8.2f} {r['faces_found']:6d} "
+            f"{str(r.get('genuine_accept', '-')):>7} {str(r.get('impostor_accept', '-')):>7}"
+        )
+    for r in results[1:]:
+        vs = r["vs_" + profiles[0]]
+        print(f"  {r['profile']} vs {profiles[0]}: " + ", ".join(f"{k}={v}" for k, v in vs.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "threshold": VERIFY_THRESHOLD, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,3 +18,215 @@ class Config:
             "phone": "8888888888"
         }
     ]
+
+    # ---------------- FACE INFERENCE ----------------
+    # Named model profiles:
+    #   model      insightface pack (~/.insightface/models/<model>)
+    #   det_size   detector input size
+    #   modules    models of the pack to load; the flow uses detection,
+    #              recognition and landmark_3d_68 (genderage and
+    #              landmark_2d_106 would only cost time on every face)
+    #   rec_file   optional recognizer .onnx used instead of the pack's,
+    #              e.g. an int8-quantized copy
+    #   embedding  embedding space of the recognizer. Stored templates
+    #              only match captures from the same space, so the
+    #              enrollment and gate profiles must agree (changing it
+    #              means re-enrolling every face).
+    # Profiles on the same pack share their ONNX sessions.
+    # Compare them with: python -m benchmarks.bench_face_profiles
+    FACE_MODEL_PROFILES = {
+        "accurate": {
+            "model": "buffalo_l",
+            "det_size": (640, 640),
+            "modules": ("detection", "recognition", "landmark_3d_68"),
+            "embedding": "w600k_r50"
+        },
+        "fast": {
+            "model": "buffalo_s",
+            "det_size": (640, 640),
+            "modules": ("detection", "recognition", "landmark_3d_68"),
+            "embedding": "w600k_mbf"
+        },
+        "gate": {
+            "model": "buffalo_l",
+            "det_size": (320, 320),
+            "modules": ("detection", "recognition", "landmark_3d_68"),
+            "embedding": "w600k_r50"
+        }
+    }
+    # Enrollment: register / validate / replace / bulk enrollment.
+    # Gate: verify, verify/stream, identify.
+    FACE_ENROLL_PROFILE = "accurate"
+    FACE_GATE_PROFILE = "accurate"
+
+    # Dedicated inference workers pulling from one bounded queue
+    FACE_INFERENCE_WORKERS = 2
+    FACE_INFERENCE_QUEUE_SIZE = 64
+    FACE_INFERENCE_TIMEOUT_S = 30
+
+    # Recognition micro-batching: wait this long for more frames
+    FACE_BATCH_WINDOW_MS = 4
+    FACE_MAX_BATCH = 8
+
+    # ONNX Runtime threading (per session)
+    FACE_ORT_INTRA_OP_THREADS = 2
+    FACE_ORT_INTER_OP_THREADS = 1
+
+    # Optional shared inference daemon (python -m services.face_daemon).
+    # When set, API workers send frames here instead of loading models.
+    FACE_DAEMON_SOCKET = None   # e.g. "/run/facesure/face.sock"
+    # Shared secret for the socket (it carries pickled frames). Required
+    # with FACE_DAEMON_SOCKET, e.g. secrets.token_bytes(32); no default.
+    FACE_DAEMON_AUTHKEY = b""
+
+    # Startup: models load in the background and run one warmup frame.
+    # ORT-optimized graphs are cached here so restarts skip optimization
+    # (None disables the cache).
+    FACE_WARMUP = True
+    FACE_ORT_CACHE_DIR = "~/.insightface/ort_cache"
+
+    # Detector cascade for snapshot captures (register / verify /
+    # identify ...): MediaPipe BlazeFace checks for exactly one face on a
+    # small copy of the frame, then the profile's detector and recognizer
+    # run on a padded crop around it at FACE_PREFILTER_DET_SIZE.
+    # Needs mediapipe; without it the single-stage pipeline is used.
+    FACE_PREFILTER_ENABLED = False
+    FACE_PREFILTER_MODEL = 0              # 0 = short range (< 2 m), 1 = full range
+    FACE_PREFILTER_MIN_CONFIDENCE = 0.5
+    FACE_PREFILTER_MAX_SIDE = 320         # frame is downscaled to this first
+    FACE_PREFILTER_PAD = 0.5              # crop = face box + this much per side
+    FACE_PREFILTER_DET_SIZE = (256, 256)  # heavy detector input for the crop
+    # Another face at least this wide (relative to the largest) counts
+    # as a second person; smaller ones are background
+    FACE_PREFILTER_RIVAL_RATIO = 0.6
+
+    # ---------------- FACE VECTOR SEARCH ----------------
+    # "atlas" → $vectorSearch on face_vector_index
+    # "local" → in-process NumPy matrix (works on a plain mongod)
+    # "hnsw"  → local gallery + hnswlib ANN graph (large galleries)
+    FACE_VECTOR_BACKEND = "atlas"
+    FACE_VECTOR_DIM = 512
+    # Local backend: tail the face_vectors change stream so writes made
+    # by other workers show up (needs a replica set, as transactions do)
+    FACE_VECTOR_FOLLOW_CHANGES = True
+    # Seconds load() / a search waits for the local gallery before
+    # giving up with a 503 (the follower keeps retrying in the background)
+    FACE_VECTOR_LOAD_TIMEOUT = 60
+    # Local backend: directory for the shared mmap snapshot (None = off)
+    FACE_VECTOR_SNAPSHOT_DIR = None   # e.g. "/var/lib/facesure/vectors"
+
+    # Embedding representation: "float32" | "float16" | "int8"
+    # float32 is stored as a normalized BSON binary vector (legacy
+    # arrays: python -m scripts.migrate_face_vectors).
+    # Quantized storage is only readable by the local backend (the Atlas
+    # index needs float32); the gallery dtype only affects memory/scoring.
+    FACE_VECTOR_STORAGE_DTYPE = "float32"
+    FACE_VECTOR_GALLERY_DTYPE = "float32"
+
+    # HNSW backend (hnswlib). Galleries smaller than FACE_HNSW_MIN_SIZE
+    # are still searched exactly.
+    FACE_HNSW_M = 16
+    FACE_HNSW_EF_CONSTRUCTION = 200
+    FACE_HNSW_EF_SEARCH = 64
+    FACE_HNSW_MIN_SIZE = 20000
+
+    # ---------------- FACE VERIFICATION ----------------
+    # Per-worker LRU/TTL cache of ready-to-score templates (0 = off).
+    # Size it to a college's daily exit volume.
+    FACE_TEMPLATE_CACHE_SIZE = 5000
+    FACE_TEMPLATE_CACHE_TTL_S = 600
+
+    # Validated-face tokens (/face/validate → registration)
+    FACE_TOKEN_TTL_S = 300
+    FACE_TOKEN_STORE_MAX_BYTES = 64 * 1024 * 1024
+    # SQLite file shared by all workers on this host (None = per-worker memory)
+    FACE_TOKEN_STORE_PATH = None   # e.g. "/run/facesure/face_tokens.db"
+
+    # 1:N gate identification (/face/identify) against the college's
+    # APPROVED requests. Galleries are rebuilt after this many seconds
+    # to pick up approvals handled by other workers.
+    FACE_GATE_GALLERY_TTL_S = 120
+    # Best match must beat the runner-up by this much
+    FACE_IDENTIFY_MIN_MARGIN = 0.05
+
+    # ---------------- BULK ENROLLMENT ----------------
+    # Files decoded / embedded concurrently (keep below the inference
+    # queue size so live gate traffic still gets in)
+    FACE_BULK_WORKERS = 8
+    # Students committed per transaction
+    FACE_BULK_COMMIT_CHUNK = 200
+
+    # ---------------- IMAGE DECODING ----------------
+    FACE_UPLOAD_MAX_BYTES = 8 * 1024 * 1024
+    FACE_IMAGE_MAX_SIDE = 8192
+    FACE_IMAGE_MAX_PIXELS = 40_000_000
+    # Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale while the long
+    # side stays >= this (the detector works at 640)
+    FACE_DECODE_MIN_SIDE = 960
+    # Faces narrower than this in a reduced frame are re-read at full
+    # resolution before recognition
+    FACE_MIN_REC_FACE_PX = 112
+
+    # ---------------- FRAME QUALITY GATE ----------------
+    # Checked before any inference on a grayscale preview of the decoded
+    # frame (long side FACE_QUALITY_PREVIEW_SIDE); failing frames are
+    # rejected with a specific reason and never reach the models.
+    #   min_side        short side of the uploaded image, pixels
+    #   min_sharpness   Laplacian variance of the preview
+    #   min_brightness / max_brightness   mean gray level, 0-255
+    #   max_clipped     share of preview pixels crushed black or blown white
+    # None disables a check. "enroll": register / validate / replace /
+    # bulk; "gate": verify / identify; "stream": verify/stream frames
+    # (which also get a face-crop sharpness check after detection).
+    FACE_QUALITY_PREVIEW_SIDE = 256
+    FACE_QUALITY_GATES = {
+        "enroll": {
+            "min_side": 360,
+            "min_sharpness": 40.0,
+            "min_brightness": 50,
+            "max_brightness": 210,
+            "max_clipped": 0.35
+        },
+        "gate": {
+            "min_side": 240,
+            "min_sharpness": 20.0,
+            "min_brightness": 35,
+            "max_brightness": 225,
+            "max_clipped": 0.5
+        },
+        "stream": {
+            "min_side": 240,
+            "min_sharpness": None,
+            "min_brightness": 35,
+            "max_brightness": 225,
+            "max_clipped": 0.5
+        }
+    }
+
+    # ---------------- ENROLLMENT FRAMING (/face/frame-check) ----------------
+    # Detection-only preview checks, a few per second while the user
+    # lines up for the registration photo
+    FACE_FRAME_CHECK_DET_SIZE = (256, 256)
+    # Face width as a share of the frame width
+    FACE_FRAME_MIN_FACE_RATIO = 0.25
+    FACE_FRAME_MAX_FACE_RATIO = 0.7
+    # Face center offset from the frame center, share of the frame size
+    FACE_FRAME_MAX_OFFSET = 0.15
+    # Nose offset from the eyes' midpoint, share of the eye distance
+    # (rough yaw from the detector keypoints)
+    FACE_FRAME_MAX_YAW = 0.3
+    FACE_FRAME_MIN_DET_SCORE = 0.6
+
+    # ---------------- GATE STREAMING (/face/verify/stream) ----------------
+    FACE_STREAM_MAX_FRAMES = 40
+    FACE_STREAM_TIMEOUT_S = 20
+    # Per-frame quality gate before recognition runs
+    FACE_STREAM_MIN_DET_SCORE = 0.6
+    FACE_STREAM_MIN_FACE_PX = 80
+    FACE_STREAM_MIN_SHARPNESS = 60.0
+    # Face box overlap with the previous frame (steady subject)
+    FACE_STREAM_MIN_IOU = 0.5
+    # Tracked ROI = face box grown by this fraction on each side
+    FACE_STREAM_ROI_MARGIN = 0.6
+    # Recognized frames below VERIFY_THRESHOLD before giving up
+    FACE_STREAM_REJECT_AFTER = 3
@@ -0,0 +1,86 @@
+"""
+Request parsing for face endpoints.
+
+Every face upload endpoint accepts three encodings:
+    application/json      the pydantic model, image as image_b64
+    multipart/form-data   model fields as form fields + file part "image"
+    image/jpeg, image/png raw encoded bytes; model fields as query params
+
+Binary bodies skip base64 entirely: the bytes go to decode_image_bytes,
+which wraps them with np.frombuffer (no copy) for cv2.imdecode.
+"""
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+
+from config import Config
+
+IMAGE_FIELD = "image"
+_RAW_TYPES = ("image/jpeg", "image/png", "application/octet-stream")
+
+
+def _too_large():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Image too large"
+    )
+
+
+def _validate(model, fields):
+    try:
+        return model.model_validate(fields)
+    except ValidationError as e:
+        # Same 400 "Invalid request data" shape as regular JSON bodies
+        raise RequestValidationError(e.errors())
+
+
+async def read_face_upload(request: Request, model):
+    """
+    Returns (payload, image): the validated `model` and the image as raw
+    bytes (binary uploads) or the base64 string (JSON), None if absent.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    # JSON carries base64 (4/3 of the bytes); refuse before reading the body
+    limit = Config.FACE_UPLOAD_MAX_BYTES * 4 // 3 + 64 * 1024
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise _too_large()
+
+    if content_type == "multipart/form-data":
+        form = await request.form(max_files=1, max_fields=16)
+        fields = {}
+        image = None
+        for key, value in form.multi_items():
+            if isinstance(value, UploadFile):
+                if key == IMAGE_FIELD:
+                    image = await value.read()
+            else:
+                fields[key] = value
+        await form.close()
+        payload = _validate(model, fields)
+
+    elif content_type in _RAW_TYPES:
+        image = await request.body()
+        payload = _validate(model, dict(request.query_params))
+
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid JSON body"
+            )
+        payload = _validate(model, body)
+        image = getattr(payload, "image_b64", None)
+
+    if image is not None and len(image) > limit:
+        raise _too_large()
+    if not image and not getattr(payload, "face_token", None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Face image is required"
+        )
+    return payload, image or None
@@ -1,7 +1,12 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE
+)
+from data.vector_store import VectorStoreUnavailable
 
 FRONTEND_ORIGIN = "http://localhost:5173"
 
@@ -30,7 +35,8 @@ def init_exception_handlers(app):
     async def http_exception_handler(request: Request, exc: HTTPException):
         return JSONResponse(
             status_code=exc.status_code,
-            headers=cors_headers(),
+            # e.g. Retry-After on 503s
+            headers={**(exc.headers or {}), **cors_headers()},
             content={
                 "success": False,
                 "statusCode": exc.status_code,
@@ -38,6 +44,18 @@ def init_exception_handlers(app):
             }
         )
 
+    @app.exception_handler(VectorStoreUnavailable)
+    async def vector_store_exception_handler(request: Request, exc: VectorStoreUnavailable):
+        return JSONResponse(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            headers={**cors_headers(), "Retry-After": "5"},
+            content={
+                "success": False,
+                "statusCode": HTTP_503_SERVICE_UNAVAILABLE,
+                "message": "Face search is not ready. Please retry."
+            }
+        )
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
         return JSONResponse(
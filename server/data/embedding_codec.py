@@ -0,0 +1,153 @@
+"""
+Embedding representations and scoring kernels.
+
+Gallery / storage dtypes:
+    float32  exact (default)
+    float16  half the memory, ~1e-3 similarity drift
+    int8     a quarter of the memory; each L2-normalized vector is scaled
+             by its own max |x| / 127 before rounding
+
+Cosine similarity is scale invariant, so int8 rows are scored directly
+on their codes and the per-vector scale is only needed to dequantize.
+"""
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+from config import Config
+
+GALLERY_DTYPES = ("float32", "float16", "int8")
+
+
+def normalize(vec):
+    v = np.asarray(vec, dtype=np.float32).reshape(-1)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+
+# ==========================================================
+# QUANTIZATION
+# ==========================================================
+def quantize(vec, dtype):
+    """Returns (codes, scale) for an already normalized float32 vector."""
+    if dtype == "float32":
+        return vec, 1.0
+    if dtype == "float16":
+        return vec.astype(np.float16), 1.0
+    if dtype == "int8":
+        peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        codes = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return codes, scale
+    raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+
+def dequantize(codes, scale=1.0):
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+# ==========================================================
+# SCORING KERNELS
+# ==========================================================
+def cosine_scores(matrix, query, dtype):
+    """
+    Cosine similarity of `query` against every row of `matrix`.
+    Both must already be in `dtype`; float rows must be normalized.
+    """
+    if matrix.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    if simsimd is not None:
+        metric = "cosine" if dtype == "int8" else "dot"
+        out = np.asarray(simsimd.cdist(query[None, :], matrix, metric=metric))[0]
+        if dtype == "int8":
+            out = 1.0 - out
+        return out.astype(np.float32)
+
+    scores = matrix.astype(np.float32) @ query.astype(np.float32)
+    if dtype == "int8":
+        norms = np.linalg.norm(matrix.astype(np.float32), axis=1)
+        norms *= float(np.linalg.norm(query.astype(np.float32)))
+        scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+    return scores
+
+
+def cosine_similarity(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    if simsimd is not None:
+        return 1.0 - float(simsimd.cosine(a, b))
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+# ==========================================================
+# STORAGE (face_vectors documents)
+# ==========================================================
+# Stored formats of face_vectors.embedding:
+#   BSON vector (binary subtype 9), float32, L2-normalized  <- current
+#   raw binary + embedding_dtype "float16" / "int8"          <- quantized
+#   array of doubles                                         <- legacy
+VECTOR_SUBTYPE = 9
+_VECTOR_DTYPES = {
+    BinaryVectorDtype.FLOAT32.value[0]: np.dtype("<f4"),
+    BinaryVectorDtype.INT8.value[0]: np.dtype("i1")
+}
+
+
+def encode_embedding(emb, dtype=Config.FACE_VECTOR_STORAGE_DTYPE):
+    """Returns the face_vectors fields that hold `emb`, normalized."""
+    vec = normalize(emb)
+
+    if dtype == "float32":
+        # Same binary vector format the Atlas vector index reads
+        return {"embedding": Binary.from_vector(vec, BinaryVectorDtype.FLOAT32)}
+
+    codes, scale = quantize(vec, dtype)
+    fields = {
+        "embedding": Binary(codes.tobytes()),
+        "embedding_dtype": dtype
+    }
+    if dtype == "int8":
+        fields["embedding_scale"] = scale
+    return fields
+
+
+def decode_embedding(doc):
+    """float32 embedding from a face_vectors document, any stored format."""
+    dtype = doc.get("embedding_dtype")
+    raw = doc["embedding"]
+
+    if isinstance(raw, Binary) and raw.subtype == VECTOR_SUBTYPE:
+        # 2-byte header: dtype, padding
+        vec = np.frombuffer(raw, dtype=_VECTOR_DTYPES[raw[0]], offset=2)
+        return vec.astype(np.float32, copy=False)
+    if dtype == "int8":
+        codes = np.frombuffer(raw, dtype=np.int8)
+        return dequantize(codes, doc.get("embedding_scale", 1.0))
+    if dtype == "float16":
+        return np.frombuffer(raw, dtype=np.float16).astype(np.float32)
+    return np.asarray(raw, dtype=np.float32)
+
+
+def is_legacy_embedding(doc):
+    return isinstance(doc.get("embedding"), list)
+
+
+def encode_landmarks(lm):
+    """68-point 3D landmarks as packed float32 (stored next to the vector)."""
+    return Binary(np.ascontiguousarray(lm, dtype=np.float32).tobytes())
+
+
+def decode_landmarks(doc):
+    raw = doc.get("landmarks")
+    if raw is None:
+        return None
+    return np.frombuffer(raw, dtype=np.float32).reshape(-1, 3)
+
+
+# Projection that carries everything decode_embedding() needs
+EMBEDDING_FIELDS = {"embedding": 1, "embedding_dtype": 1, "embedding_scale": 1}
@@ -1,41 +1,118 @@
-from extensions.mongo import db
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from extensions.mongo import client, db
+from data.vector_store import create_vector_store, VectorStoreUnavailable
+from data.embedding_codec import encode_embedding, encode_landmarks
 
 face_vectors = db["face_vectors"]
+vector_store = create_vector_store(face_vectors)
 
-def create_vector(vector_id, user_id, embedding, session=None):
+def init_vector_store():
+    try:
+        vector_store.load()
+    except VectorStoreUnavailable as e:
+        # Serve anyway: searches answer 503 until the follower catches up
+        print("❌", e)
+
+# vector_store updates queued on a vector_transaction session
+_PENDING = "_face_vector_changes"
+
+@contextmanager
+def vector_transaction():
+    """
+    Session + transaction for writes that touch face_vectors. The
+    in-process vector_store is updated only once the transaction has
+    committed: an abort leaves this worker's gallery untouched (the
+    change stream only replays committed writes, so nothing would put
+    it right).
+    """
+    with client.start_session() as session:
+        setattr(session, _PENDING, [])
+        with session.start_transaction():
+            yield session
+        for apply in getattr(session, _PENDING):
+            apply()
+
+def _sync_store(session, apply):
+    pending = getattr(session, _PENDING, None) if session is not None else None
+    if pending is None:
+        apply()
+    else:
+        pending.append(apply)
+
+def _vector_doc(vector_id, user_id, embedding, landmarks=None):
     doc = {
         "_id": vector_id,
         "user_id": user_id,
-        "embedding": embedding
+        **encode_embedding(embedding),
+        "updated_at": datetime.utcnow()
     }
-    return face_vectors.insert_one(doc, session=session)
+    if landmarks is not None:
+        doc["landmarks"] = encode_landmarks(landmarks)
+    return doc
+
+def create_vector(vector_id, user_id, embedding, landmarks=None, session=None):
+    res = face_vectors.insert_one(
+        _vector_doc(vector_id, user_id, embedding, landmarks),
+        session=session
+    )
+    _sync_store(session, lambda: vector_store.add(vector_id, user_id, embedding))
+    return res
+
+def create_vectors(items, session=None):
+    """Bulk create_vector: items are (vector_id, user_id, embedding, landmarks)."""
+    res = face_vectors.insert_many(
+        [_vector_doc(*item) for item in items],
+        ordered=False,
+        session=session
+    )
+    def apply():
+        for vector_id, user_id, embedding, _ in items:
+            vector_store.add(vector_id, user_id, embedding)
+    _sync_store(session, apply)
+    return res
 
 def get_vector(vector_id):
     return face_vectors.find_one({"_id": vector_id})
 
+def set_vector_landmarks(vector_id, landmarks):
+    return face_vectors.update_one(
+        {"_id": vector_id},
+        {"$set": {"landmarks": encode_landmarks(landmarks)}}
+    )
+
+def get_vectors_missing_landmarks(limit=0):
+    return face_vectors.find(
+        {"landmarks": {"$exists": False}},
+        {"user_id": 1},
+        limit=limit
+    )
+
 def delete_vector(vector_id, session=None):
-    return face_vectors.delete_one(
+    res = face_vectors.delete_one(
         {"_id": vector_id},
         session=session
     )
+    _sync_store(session, lambda: vector_store.remove(vector_id))
+    return res
+
+def delete_vectors(vector_ids, session=None):
+    vector_ids = list(vector_ids)
+    res = face_vectors.delete_many(
+        {"_id": {"$in": vector_ids}},
+        session=session
+    )
+    def apply():
+        for vector_id in vector_ids:
+            vector_store.remove(vector_id)
+    _sync_store(session, apply)
+    return res
 
 def search_similar_faces(query_vector, limit=5):
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "face_vector_index",
-                "path": "embedding",
-                "queryVector": query_vector,
-                "numCandidates": 200,
-                "limit": limit
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "user_id": 1,
-                "score": {"$meta": "vectorSearchScore"}
-            }
-        }
-    ]
-    return list(face_vectors.aggregate(pipeline))
+    return vector_store.search(query_vector, limit)
+
+def search_similar_faces_many(query_vectors, limit=5, workers=8):
+    """search_similar_faces for a batch; searches overlap across threads."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda q: vector_store.search(q, limit), query_vectors))
@@ -15,12 +15,40 @@ def create_face_doc(user_id, user_type, image_bytes, vector_ref, session=None):
     res = faces.insert_one(doc, session=session)
     return str(res.inserted_id)
 
+def create_face_docs(docs, session=None):
+    """Bulk create_face_doc: docs are (user_id, user_type, image_bytes, vector_ref)."""
+    now = datetime.utcnow()
+    res = faces.insert_many(
+        [
+            {
+                "user_id": user_id,
+                "user_type": user_type,
+                "image_data": image_bytes,
+                "vector_ref": vector_ref,
+                "created_at": now
+            }
+            for user_id, user_type, image_bytes, vector_ref in docs
+        ],
+        session=session
+    )
+    return [str(i) for i in res.inserted_ids]
+
+def delete_faces_by_users(user_ids, session=None):
+    return faces.delete_many(
+        {"user_id": {"$in": list(user_ids)}},
+        session=session
+    )
+
 def get_face_by_id(face_id: str):
     return faces.find_one({"_id": ObjectId(face_id)})
 
 def get_face_by_user(user_id: str):
     return faces.find_one({"user_id": user_id})
 
+def get_face_ref_by_user(user_id: str):
+    """Face doc without the image bytes."""
+    return faces.find_one({"user_id": user_id}, {"image_data": 0})
+
 def delete_face(face_id: str, session=None):
     return faces.delete_one(
         {"_id": ObjectId(face_id)},
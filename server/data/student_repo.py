@@ -1,3 +1,5 @@
+from datetime import datetime
+from pymongo import UpdateOne
 from extensions.mongo import db
 
 students = db["students"]
@@ -15,6 +17,24 @@ def update_student(student_id: str, updates: dict, session=None):
         session=session
     )
 
+def get_students_face_ids(student_ids, session=None):
+    """student_id -> face_id (None when not enrolled) for existing students."""
+    return {
+        s["_id"]: s.get("face_id")
+        for s in students.find({"_id": {"$in": list(student_ids)}}, {"face_id": 1}, session=session)
+    }
+
+def set_student_face_ids(face_ids: dict, session=None):
+    now = datetime.utcnow()
+    return students.bulk_write(
+        [
+            UpdateOne({"_id": sid}, {"$set": {"face_id": fid, "updated_at": now}})
+            for sid, fid in face_ids.items()
+        ],
+        ordered=False,
+        session=session
+    )
+
 def delete_student(student_id: str, session=None):
     return students.delete_one(
         {"_id": student_id},
@@ -0,0 +1,172 @@
+"""
+On-disk snapshot of the face gallery.
+
+Layout inside the snapshot directory:
+    face_vectors-<stamp>.npy   (N, dim) in the gallery dtype (float32 / float16
+                               rows L2-normalized, or int8 codes)
+    face_vectors.json          manifest: matrix file, ids, written_at
+    face_vectors.lock          held by the one process writing a snapshot
+
+The manifest is replaced last with os.replace(), so readers always see a
+complete snapshot. Matrices are opened with np.load(mmap_mode="r") and
+every uvicorn worker shares the same page-cache pages.
+"""
+import glob
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+MANIFEST = "face_vectors.json"
+LOCK = "face_vectors.lock"
+
+
+def _atomic_write(path, write):
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _try_lock(f, wait):
+    # Imported here: only snapshot writers need them, and each exists on
+    # one platform only (fcntl: POSIX, msvcrt: Windows)
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        f.seek(0)  # msvcrt locks bytes from the current position
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return lambda: msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            except OSError:
+                if not wait:
+                    return None
+                time.sleep(0.5)
+
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return None
+    return lambda: fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _writer_lock(directory, wait):
+    """Yields True when this process holds the snapshot lock, False if busy."""
+    with open(os.path.join(directory, LOCK), "a+") as f:
+        unlock = _try_lock(f, wait)
+        if unlock is None:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            unlock()
+
+
+def _manifest_matrix(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), "rb") as f:
+            return json.loads(f.read())["matrix"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_snapshot(directory, matrix, vector_ids, user_ids, written_at, wait=False):
+    """
+    written_at must be taken before the rows were read from Mongo.
+    One writer at a time: returns False without writing when another
+    process holds the lock (unless `wait`).
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _writer_lock(directory, wait) as locked:
+        if not locked:
+            return False
+        _write_snapshot(directory, matrix, vector_ids, user_ids, written_at)
+    return True
+
+
+def _write_snapshot(directory, matrix, vector_ids, user_ids, written_at):
+    previous = _manifest_matrix(directory)
+
+    stamp = written_at.strftime("%Y%m%dT%H%M%S%f")
+    matrix_file = f"face_vectors-{stamp}.npy"
+    # Kept in the gallery's dtype, so quantized galleries map it as is
+    matrix = np.ascontiguousarray(matrix)
+
+    _atomic_write(
+        os.path.join(directory, matrix_file),
+        lambda f: np.save(f, matrix, allow_pickle=False)
+    )
+
+    manifest = {
+        "matrix": matrix_file,
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "count": int(matrix.shape[0]),
+        "dtype": str(matrix.dtype),
+        "written_at": written_at.isoformat(),
+        "vector_ids": list(vector_ids),
+        "user_ids": list(user_ids)
+    }
+    _atomic_write(
+        os.path.join(directory, MANIFEST),
+        lambda f: f.write(json.dumps(manifest).encode())
+    )
+
+    # The matrix the previous manifest named stays: workers that read
+    # that manifest may not have opened it yet. Only older ones go
+    # (already-mapped files stay readable after unlink).
+    keep = {matrix_file, previous}
+    oldest_kept = min(name for name in keep if name)
+    for old in glob.glob(os.path.join(directory, "face_vectors-*.npy")):
+        name = os.path.basename(old)
+        if name not in keep and name < oldest_kept:
+            os.unlink(old)
+
+
+def read_snapshot(directory, attempts=3):
+    """Returns (matrix, vector_ids, user_ids, written_at) or None."""
+    path = os.path.join(directory, MANIFEST)
+    for attempt in range(attempts):
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            manifest = json.loads(f.read())
+
+        try:
+            matrix = np.load(
+                os.path.join(directory, manifest["matrix"]),
+                mmap_mode="r",
+                allow_pickle=False
+            )
+            break
+        except FileNotFoundError:
+            # Superseded twice between reading the manifest and opening
+            # the matrix: read the new manifest
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+    if matrix.shape[0] != len(manifest["vector_ids"]):
+        return None
+
+    return (
+        matrix,
+        manifest["vector_ids"],
+        manifest["user_ids"],
+        datetime.fromisoformat(manifest["written_at"])
+    )
@@ -0,0 +1,590 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from pymongo.errors import PyMongoError, OperationFailure
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+from config import Config
+from data.vector_snapshot import read_snapshot, write_snapshot
+from data.embedding_codec import (
+    normalize,
+    quantize,
+    cosine_scores,
+    decode_embedding,
+    EMBEDDING_FIELDS
+)
+
+
+class VectorStoreUnavailable(RuntimeError):
+    """The local gallery is not loaded (still loading, or the load keeps failing)."""
+
+
+# ==========================================================
+# SCORE SPACE
+# ==========================================================
+# Atlas reports cosine similarity as (1 + cos) / 2. Every backend
+# returns scores in that space so DUPLICATE_HIGH keeps its meaning.
+def to_search_score(cos):
+    return (1.0 + cos) / 2.0
+
+
+# ==========================================================
+# ATLAS BACKEND (DEFAULT)
+# ==========================================================
+class AtlasVectorStore:
+    """Delegates to the Atlas $vectorSearch index; nothing kept in memory."""
+
+    def __init__(self, collection, index_name="face_vector_index"):
+        self.collection = collection
+        self.index_name = index_name
+
+    def load(self):
+        pass
+
+    def add(self, vector_id, user_id, embedding):
+        pass
+
+    def remove(self, vector_id):
+        pass
+
+    def search(self, query_vector, limit=5):
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.tolist()
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": self.index_name,
+                    "path": "embedding",
+                    "queryVector": query_vector,
+                    "numCandidates": 200,
+                    "limit": limit
+                }
+            },
+            {
+                "$project": {
+                    "_id": 1,
+                    "user_id": 1,
+                    "score": {"$meta": "vectorSearchScore"}
+                }
+            }
+        ]
+        return list(self.collection.aggregate(pipeline))
+
+
+# ==========================================================
+# LOCAL BACKEND
+# ==========================================================
+class LocalVectorStore:
+    """
+    Exact search over an in-process gallery.
+
+    Embeddings live L2-normalized in contiguous matrices (float32, or
+    float16 / int8 per FACE_VECTOR_GALLERY_DTYPE) with parallel
+    vector_id / user_id arrays, so a search is one SIMD scoring pass plus
+    top-k. The gallery has two segments:
+
+    - base: a read-only snapshot matrix opened with np.memmap and shared
+      by every worker; deletes only clear its alive mask.
+    - tail: a private growable matrix for vectors written since; deletes
+      swap the last row into the hole to keep it dense.
+    """
+
+    def __init__(self, collection, dim=Config.FACE_VECTOR_DIM,
+                 follow_changes=Config.FACE_VECTOR_FOLLOW_CHANGES,
+                 snapshot_dir=Config.FACE_VECTOR_SNAPSHOT_DIR,
+                 dtype=Config.FACE_VECTOR_GALLERY_DTYPE):
+        self.collection = collection
+        self.dim = dim
+        self.dtype = dtype
+        self.follow_changes = follow_changes
+        self.snapshot_dir = snapshot_dir
+
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._ready = threading.Event()
+        # When the gallery was last read from Mongo (taken before the
+        # reads start): the written_at of the snapshots it produces
+        self._synced_at = None
+        # "loading" → "ready"; "failed" while the follower retries
+        self.state = "loading"
+        self.error = None
+        self._set_base(None, [], [])
+        self._reset(1024)
+
+    def _set_base(self, matrix, vector_ids, user_ids):
+        self._base = matrix
+        self._base_vector_ids = list(vector_ids)
+        self._base_user_ids = np.array(user_ids, dtype=object)
+        self._base_alive = np.ones(len(self._base_vector_ids), dtype=bool)
+        self._base_rows = {v: i for i, v in enumerate(self._base_vector_ids)}
+
+    def _reset(self, capacity):
+        self._matrix = np.zeros((capacity, self.dim), dtype=self.dtype)
+        self._vector_ids = [None] * capacity
+        self._user_ids = np.empty(capacity, dtype=object)
+        self._rows = {}
+        self._size = 0
+
+    def __len__(self):
+        return len(self._base_rows) + self._size
+
+    # ------------------------------------------------------
+    # LOADING
+    # ------------------------------------------------------
+    def load(self, timeout=Config.FACE_VECTOR_LOAD_TIMEOUT):
+        with self._load_lock:
+            if not self._loaded:
+                if self.follow_changes:
+                    threading.Thread(
+                        target=self._follow,
+                        name="face-vector-follower",
+                        daemon=True
+                    ).start()
+                else:
+                    self._initial_load()
+                    self._mark_ready()
+                self._loaded = True
+
+        if not self._ready.wait(timeout):
+            raise VectorStoreUnavailable(
+                f"Face gallery not loaded ({self.error or self.state})"
+            )
+
+    def _mark_ready(self):
+        self.state = "ready"
+        self.error = None
+        self._ready.set()
+
+    def _initial_load(self):
+        if self.snapshot_dir:
+            snap = read_snapshot(self.snapshot_dir)
+            if (
+                snap is not None
+                and snap[0].shape[1:] == (self.dim,)
+                and snap[0].dtype == np.dtype(self.dtype)
+            ):
+                self._load_snapshot(*snap)
+                return
+
+        self.bulk_load()
+        if self.snapshot_dir:
+            self.write_snapshot()
+
+    def bulk_load(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            self._synced_at = datetime.utcnow()
+            self._set_base(None, [], [])
+            self._reset(max(1024, self.collection.estimated_document_count()))
+            cursor = self.collection.find(
+                {},
+                {"user_id": 1, **EMBEDDING_FIELDS},
+                batch_size=2000
+            )
+            for doc in cursor:
+                self._put(doc["_id"], doc["user_id"], decode_embedding(doc))
+        print(f"✅ Loaded {len(self)} face vectors in {time.perf_counter() - t0:.2f}s")
+
+    def _load_snapshot(self, matrix, vector_ids, user_ids, written_at):
+        t0 = time.perf_counter()
+        with self._lock:
+            self._synced_at = datetime.utcnow()
+            self._set_base(matrix, vector_ids, user_ids)
+            self._reset(1024)
+            replayed = self._replay_since(written_at)
+        print(
+            f"✅ Mapped {len(vector_ids)} face vectors from snapshot, "
+            f"replayed {replayed} changes in {time.perf_counter() - t0:.2f}s"
+        )
+
+    def _replay_since(self, written_at):
+        """Applies face_vectors changes made after the snapshot was taken."""
+        current = {
+            doc["_id"]: doc.get("updated_at")
+            for doc in self.collection.find({}, {"updated_at": 1}, batch_size=5000)
+        }
+
+        deleted = [v for v in self._base_rows if v not in current]
+        for vector_id in deleted:
+            self.remove(vector_id)
+
+        changed = [
+            v for v, ts in current.items()
+            if v not in self._base_rows or (ts is not None and ts >= written_at)
+        ]
+        for i in range(0, len(changed), 1000):
+            cursor = self.collection.find(
+                {"_id": {"$in": changed[i:i + 1000]}},
+                {"user_id": 1, **EMBEDDING_FIELDS}
+            )
+            for doc in cursor:
+                self._put(doc["_id"], doc["user_id"], decode_embedding(doc))
+
+        return len(deleted) + len(changed)
+
+    def write_snapshot(self, wait=False):
+        """
+        Writes the live gallery to snapshot_dir (atomic). Returns the
+        number of vectors written, or None when another process was
+        already writing one (unless `wait`).
+        """
+        with self._lock:
+            # Changes committed while the rows were being read may be
+            # missing: stamp the snapshot with the start of that read so
+            # the next _replay_since picks them up
+            written_at = self._synced_at or datetime.utcnow()
+            live = np.flatnonzero(self._base_alive)
+            parts = [self._matrix[:self._size]]
+            if self._base is not None and live.size:
+                parts.insert(0, np.asarray(self._base[live]))
+            matrix = np.vstack(parts)
+            vector_ids = [self._base_vector_ids[i] for i in live] + self._vector_ids[:self._size]
+            user_ids = list(self._base_user_ids[live]) + list(self._user_ids[:self._size])
+
+        if not write_snapshot(self.snapshot_dir, matrix, vector_ids, user_ids, written_at, wait=wait):
+            return None
+        return len(vector_ids)
+
+    def _follow(self):
+        # Any failure (stream, bad document, unreadable snapshot) reloads
+        # from scratch with backoff; the gallery keeps serving its last
+        # state meanwhile, and load() callers time out instead of hanging.
+        delay = 1
+        while True:
+            try:
+                if not self._stream():
+                    return
+            except Exception as e:
+                if self.state == "ready":
+                    delay = 1
+                self.state = "failed"
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"[VECTOR-STORE] Gallery sync failed, retrying in {delay}s:", self.error)
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+            else:
+                delay = 1
+
+    def _stream(self):
+        """
+        Loads the gallery and applies changes until the stream ends.
+        Returns False when the server has no change streams (standalone
+        mongod): the gallery is then loaded once and not followed.
+        """
+        try:
+            # Open the stream before the initial load so nothing written
+            # in between is missed; replays are idempotent upserts.
+            stream = self.collection.watch(full_document="updateLookup")
+        except OperationFailure as e:
+            if self._ready.is_set():
+                raise
+            print("[VECTOR-STORE] No change streams, loading once:", e)
+            self._initial_load()
+            self._mark_ready()
+            return False
+
+        with stream:
+            self._initial_load()
+            self._mark_ready()
+            for change in stream:
+                self._apply_change(change)
+        return True
+
+    def _apply_change(self, change):
+        op = change["operationType"]
+        key = change["documentKey"]["_id"]
+        if op == "delete":
+            self.remove(key)
+        elif op in ("insert", "replace", "update"):
+            doc = change.get("fullDocument")
+            if doc and "embedding" in doc:
+                self.add(key, doc["user_id"], decode_embedding(doc))
+
+    # ------------------------------------------------------
+    # INCREMENTAL UPDATES
+    # ------------------------------------------------------
+    def _put(self, vector_id, user_id, embedding):
+        base_row = self._base_rows.pop(vector_id, None)
+        if base_row is not None:
+            self._base_alive[base_row] = False
+
+        row = self._rows.get(vector_id)
+        if row is None:
+            if self._size == self._matrix.shape[0]:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[vector_id] = row
+            self._vector_ids[row] = vector_id
+        self._matrix[row], _ = quantize(normalize(embedding), self.dtype)
+        self._user_ids[row] = user_id
+
+    def _grow(self):
+        capacity = self._matrix.shape[0] * 2
+        matrix = np.zeros((capacity, self.dim), dtype=self.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        user_ids = np.empty(capacity, dtype=object)
+        user_ids[:self._size] = self._user_ids[:self._size]
+        self._matrix = matrix
+        self._user_ids = user_ids
+        self._vector_ids.extend([None] * (capacity - len(self._vector_ids)))
+
+    def add(self, vector_id, user_id, embedding):
+        with self._lock:
+            self._put(vector_id, user_id, embedding)
+
+    def remove(self, vector_id):
+        with self._lock:
+            base_row = self._base_rows.pop(vector_id, None)
+            if base_row is not None:
+                self._base_alive[base_row] = False
+                return
+
+            row = self._rows.pop(vector_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved = self._vector_ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._user_ids[row] = self._user_ids[last]
+                self._vector_ids[row] = moved
+                self._rows[moved] = row
+            self._vector_ids[last] = None
+            self._user_ids[last] = None
+            self._size = last
+
+    # ------------------------------------------------------
+    # SEARCH
+    # ------------------------------------------------------
+    @staticmethod
+    def _top_k(scores, k):
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top])]
+
+    def search(self, query_vector, limit=5):
+        if not self._ready.is_set():
+            self.load()
+
+        q, _ = quantize(normalize(query_vector), self.dtype)
+        hits = []
+        with self._lock:
+            if self._base is not None and self._base_rows:
+                scores = cosine_scores(self._base, q, self.dtype)
+                scores[~self._base_alive] = -np.inf
+                for i in self._top_k(scores, min(limit, len(self._base_rows))):
+                    hits.append((
+                        float(scores[i]),
+                        self._base_vector_ids[i],
+                        self._base_user_ids[i]
+                    ))
+
+            n = self._size
+            if n:
+                scores = cosine_scores(self._matrix[:n], q, self.dtype)
+                for i in self._top_k(scores, min(limit, n)):
+                    hits.append((float(scores[i]), self._vector_ids[i], self._user_ids[i]))
+
+        hits.sort(key=lambda h: h[0], reverse=True)
+        return [
+            {"_id": vid, "user_id": uid, "score": to_search_score(score)}
+            for score, vid, uid in hits[:limit]
+        ]
+
+
+# ==========================================================
+# HNSW BACKEND (APPROXIMATE)
+# ==========================================================
+class HnswGraph:
+    """
+    hnswlib graph over normalized float32 vectors (inner product space),
+    keyed by vector_id, with incremental insert / delete. Deleted labels
+    are reused by the next insert (hnswlib overwrites the node and
+    unmarks it), so re-enrollments don't pile up dead nodes.
+    """
+
+    def __init__(self, dim, m=Config.FACE_HNSW_M,
+                 ef_construction=Config.FACE_HNSW_EF_CONSTRUCTION,
+                 ef=Config.FACE_HNSW_EF_SEARCH):
+        if hnswlib is None:
+            raise RuntimeError("hnswlib is not installed")
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self.build(np.zeros((0, dim), dtype=np.float32), [], [])
+
+    def build(self, vectors, vector_ids, user_ids):
+        self._index = hnswlib.Index(space="ip", dim=self.dim)
+        self._index.init_index(
+            max_elements=max(1024, len(vector_ids)),
+            M=self.m,
+            ef_construction=self.ef_construction
+        )
+        self._index.set_ef(self.ef)
+
+        self._labels = {}
+        self._vector_ids = []
+        self._user_ids = []
+        self._free = []   # deleted labels, reused by upsert
+
+        for vector_id, user_id in zip(vector_ids, user_ids):
+            self._labels[vector_id] = len(self._vector_ids)
+            self._vector_ids.append(vector_id)
+            self._user_ids.append(user_id)
+        if len(vector_ids):
+            self._index.add_items(
+                np.ascontiguousarray(vectors, dtype=np.float32),
+                np.arange(len(vector_ids)),
+                num_threads=-1
+            )
+
+    def __len__(self):
+        return len(self._labels)
+
+    def size_bytes(self):
+        return self._index.index_file_size()
+
+    def set_ef(self, ef):
+        self.ef = ef
+        self._index.set_ef(ef)
+
+    def upsert(self, vector_id, user_id, vec):
+        label = self._labels.get(vector_id)
+        if label is None:
+            if self._free:
+                label = self._free.pop()
+                self._vector_ids[label] = vector_id
+                self._user_ids[label] = user_id
+            else:
+                label = len(self._vector_ids)
+                self._vector_ids.append(vector_id)
+                self._user_ids.append(user_id)
+                if label >= self._index.get_max_elements():
+                    self._index.resize_index(self._index.get_max_elements() * 2)
+            self._labels[vector_id] = label
+        else:
+            self._user_ids[label] = user_id
+        # On an existing label (live, or deleted and being reused) this
+        # updates the node in place and clears its deleted mark
+        self._index.add_items(vec[None, :].astype(np.float32), np.array([label]))
+
+    def remove(self, vector_id):
+        label = self._labels.pop(vector_id, None)
+        if label is not None:
+            self._index.mark_deleted(label)
+            self._free.append(label)
+
+    def search(self, query, limit):
+        """Returns [(cos, vector_id, user_id)], best first."""
+        k = min(limit, len(self._labels))
+        if k == 0:
+            return []
+        labels, distances = self._index.knn_query(query[None, :], k=k)
+        return [
+            (1.0 - float(d), self._vector_ids[l], self._user_ids[l])
+            for l, d in zip(labels[0], distances[0])
+        ]
+
+
+class HnswVectorStore(LocalVectorStore):
+    """
+    Local gallery plus an HNSW graph for approximate search.
+
+    The exact gallery is kept (snapshots, rebuilds) and is still used
+    for small galleries, below FACE_HNSW_MIN_SIZE, and for
+    search(exact=True).
+    """
+
+    def __init__(self, collection, min_size=Config.FACE_HNSW_MIN_SIZE, **kwargs):
+        super().__init__(collection, **kwargs)
+        self.min_size = min_size
+        self.graph = HnswGraph(self.dim)
+        self._graph_paused = False
+
+    def _live_rows(self):
+        live = np.flatnonzero(self._base_alive)
+        parts = [self._matrix[:self._size].astype(np.float32)]
+        if self._base is not None and live.size:
+            parts.insert(0, np.asarray(self._base[live], dtype=np.float32))
+        vectors = np.vstack(parts)
+        # Quantized galleries are re-normalized for the graph
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        vector_ids = [self._base_vector_ids[i] for i in live] + self._vector_ids[:self._size]
+        user_ids = list(self._base_user_ids[live]) + list(self._user_ids[:self._size])
+        return vectors, vector_ids, user_ids
+
+    def _rebuild_graph(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.graph.build(*self._live_rows())
+        print(f"✅ Built HNSW graph over {len(self.graph)} vectors in {time.perf_counter() - t0:.2f}s")
+
+    def bulk_load(self):
+        self._graph_paused = True
+        try:
+            super().bulk_load()
+        finally:
+            self._graph_paused = False
+        self._rebuild_graph()
+
+    def _load_snapshot(self, *snap):
+        self._graph_paused = True
+        try:
+            super()._load_snapshot(*snap)
+        finally:
+            self._graph_paused = False
+        self._rebuild_graph()
+
+    def _put(self, vector_id, user_id, embedding):
+        super()._put(vector_id, user_id, embedding)
+        if not self._graph_paused:
+            self.graph.upsert(vector_id, user_id, normalize(embedding))
+
+    def remove(self, vector_id):
+        with self._lock:
+            super().remove(vector_id)
+            if not self._graph_paused:
+                self.graph.remove(vector_id)
+
+    def search(self, query_vector, limit=5, exact=False):
+        if not self._ready.is_set():
+            self.load()
+        if exact or len(self) < self.min_size:
+            return super().search(query_vector, limit)
+
+        q = normalize(query_vector)
+        with self._lock:
+            hits = self.graph.search(q, limit)
+        return [
+            {"_id": vid, "user_id": uid, "score": to_search_score(score)}
+            for score, vid, uid in hits
+        ]
+
+
+# ==========================================================
+# FACTORY
+# ==========================================================
+def create_vector_store(collection, backend=Config.FACE_VECTOR_BACKEND):
+    if backend == "local":
+        return LocalVectorStore(collection)
+    if backend == "hnsw":
+        if hnswlib is None:
+            print("❌ hnswlib not installed, falling back to exact local search")
+            return LocalVectorStore(collection)
+        return HnswVectorStore(collection)
+    if backend == "atlas":
+        if Config.FACE_VECTOR_STORAGE_DTYPE != "float32":
+            raise ValueError("Atlas vector search needs float32 stored embeddings")
+        return AtlasVectorStore(collection)
+    raise ValueError(f"Unknown face vector backend: {backend}")
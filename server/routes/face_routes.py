@@ -1,16 +1,38 @@
-from fastapi import APIRouter, Depends
-from security.dependencies import require_roles
+import asyncio
+import shutil
+import tempfile
+import time
+
+from fastapi import (
+    APIRouter, Depends, File, HTTPException, Request,
+    UploadFile, WebSocket, WebSocketDisconnect
+)
+from fastapi.concurrency import run_in_threadpool
+from config import Config
+from security.dependencies import require_roles, authorize_websocket
 from services.face_service import (
     verify_then_replace_face,
-    verify_face_for_user
+    verify_face_for_user,
+    capture_face
+)
+from services.face_validation_service import (
+    validate_and_cache_face,
+    resolve_face_capture
 )
-from services.face_validation_service import validate_and_cache_face
+from services.face_template_cache import template_cache
+from services.face_stream_service import FaceStreamSession
+from services.gate_gallery_service import identify_at_gate
+from services.bulk_enrollment_service import start_bulk_enrollment, get_bulk_enrollment
+from services.face_frame_check import check_frame
 from schemas.api_request_models import (
     FaceReplaceRequest,
     FaceVerifyRequest,
-    FaceValidateRequest
+    FaceValidateRequest,
+    FaceIdentifyRequest,
+    FaceFrameCheckRequest
 )
 from core.global_response import success
+from core.face_upload import read_face_upload
 
 router = APIRouter(prefix="/face", tags=["Face Biometrics"])
 
@@ -19,41 +41,47 @@ router = APIRouter(prefix="/face", tags=["Face Biometrics"])
 # 1. FACE REGISTRATION
 # ==========================================================
 @router.post("/register")
-def register_face_route(
-    payload: FaceReplaceRequest,
+async def register_face_route(
+    request: Request,
     _=Depends(require_roles("STUDENT", "HOD", "GUARD", "ADMIN", "SUPER_ADMIN"))
 ):
     """
     Registers or replaces a user's face biometric.
+    Accepts image_b64 (JSON), a multipart "image" file or a raw
+    image/jpeg body, or the face_token from /face/validate
+    (no second inference).
     Enforces:
     - Exactly one face
     - No duplicate faces globally
     """
+    payload, image = await read_face_upload(request, FaceReplaceRequest)
+    await run_in_threadpool(_replace_face, payload, image)
+
+    return success("Face registered successfully")
+
+
+def _replace_face(payload, image):
     verify_then_replace_face(
         user_id=payload.user_id,
         user_type=payload.user_type,
-        b64=payload.image_b64
+        capture=resolve_face_capture(image, payload.face_token)
     )
 
-    return success("Face registered successfully")
-
 
 # ==========================================================
 # 2. FACE VERIFICATION
 # ==========================================================
 @router.post("/verify")
-def verify_face_route(
-    payload: FaceVerifyRequest,
+async def verify_face_route(
+    request: Request,
     _=Depends(require_roles("STUDENT", "HOD", "GUARD", "ADMIN", "SUPER_ADMIN"))
 ):
     """
     Verifies a captured face against the stored biometric
-    of the given user.
+    of the given user (JSON, multipart or raw image body).
     """
-    ok, score = verify_face_for_user(
-        user_id=payload.user_id,
-        b64=payload.image_b64
-    )
+    payload, image = await read_face_upload(request, FaceVerifyRequest)
+    ok, score = await run_in_threadpool(verify_face_for_user, payload.user_id, image)
 
     return success(
         "Face verified" if ok else "Face mismatch",
@@ -61,21 +89,139 @@ def verify_face_route(
     )
 
 
+# ==========================================================
+# 2b. STREAMING GATE VERIFICATION (WebSocket)
+# ==========================================================
+@router.websocket("/verify/stream")
+async def verify_face_stream_route(websocket: WebSocket, user_id: str, token: str = None):
+    """
+    ws /face/verify/stream?user_id=<student>&token=<access token>
+
+    The client sends JPEG frames as binary messages, one at a time,
+    and sends the next frame after each reply (text messages are
+    skipped as bad frames). Replies are JSON:
+        {"type": "progress", "reason": "no_face" | "moving" | ...}
+        {"type": "result", "verified": bool, "score": ..., ...}  (then closed)
+        {"type": "error", "statusCode": ..., "message": ...}      (then closed)
+    """
+    await websocket.accept()
+
+    async def fail(code, message):
+        await websocket.send_json({"type": "error", "statusCode": code, "message": message})
+        await websocket.close(code=1008 if code in (401, 403) else 1011)
+
+    try:
+        await run_in_threadpool(
+            authorize_websocket, token, "STUDENT", "HOD", "GUARD", "ADMIN", "SUPER_ADMIN"
+        )
+        session = await run_in_threadpool(FaceStreamSession, user_id)
+    except HTTPException as e:
+        await fail(e.status_code, e.detail)
+        return
+
+    deadline = time.monotonic() + Config.FACE_STREAM_TIMEOUT_S
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    websocket.receive(),
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                await websocket.send_json(session.result(False, "timeout"))
+                break
+            if message["type"] == "websocket.disconnect":
+                return
+
+            frame = message.get("bytes")
+            try:
+                if frame is None:
+                    raise HTTPException(400, "Frames must be binary JPEG messages")
+                event = await run_in_threadpool(session.process, frame)
+            except HTTPException as e:
+                if e.status_code == 400:
+                    # Undecodable (or text) frame: skip it
+                    event = {"type": "progress", "frame": session.frames, "reason": "bad_frame"}
+                else:
+                    await fail(e.status_code, e.detail)
+                    return
+
+            await websocket.send_json(event)
+            if event["type"] == "result":
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        print("[FACE-STREAM] Session failed:", e)
+        try:
+            await fail(500, "Internal Server Error")
+        except Exception:
+            pass
+
+
+# ==========================================================
+# 2c. GATE IDENTIFICATION (1:N)
+# ==========================================================
+@router.post("/identify")
+async def identify_face_route(
+    request: Request,
+    guard_id=Depends(require_roles("GUARD"))
+):
+    """
+    Matches a captured face against every student with an APPROVED
+    request for the guard's college (no student_id needed).
+    Returns the matched student_id and request_id for /request/{id}/left.
+    """
+    payload, image = await read_face_upload(request, FaceIdentifyRequest)
+
+    def identify():
+        return identify_at_gate(guard_id, capture_face(image, role="gate"))
+
+    result = await run_in_threadpool(identify)
+    return success(
+        "Face identified" if result["matched"] else "No approved request matched",
+        result
+    )
+
+
 # ==========================================================
 # 3. FACE QUALITY VALIDATION (Pre-check)
 # ==========================================================
 @router.post("/validate")
-def validate_face_route(payload: FaceValidateRequest):
+async def validate_face_route(request: Request):
     """
-    Validates face quality before registration.
+    Validates face quality before registration
+    (JSON, multipart or raw image body).
     Ensures:
     - Exactly one face
     - No global duplicate
     """
-    ok, token = validate_and_cache_face(payload.image_b64)
+    payload, image = await read_face_upload(request, FaceValidateRequest)
+    ok, token = await run_in_threadpool(validate_and_cache_face, image)
     return success("Face validated", {"face_token": token})
 
 
+# ==========================================================
+# 3b. ENROLLMENT FRAMING (live camera guidance)
+# ==========================================================
+@router.post("/frame-check")
+async def frame_check_route(
+    request: Request,
+    _=Depends(require_roles("STUDENT", "HOD", "GUARD", "ADMIN", "SUPER_ADMIN"))
+):
+    """
+    Detection-only check of a live camera frame (JSON, multipart or
+    raw image body), meant to be called a few times per second before
+    capture. Returns the face count, the face box (0-1, relative to
+    the frame), a hint and whether the frame is ready to register.
+    No recognition, duplicate search or storage.
+    """
+    payload, image = await read_face_upload(request, FaceFrameCheckRequest)
+    result = await run_in_threadpool(check_frame, image)
+    return success(result["message"], result)
+
+
 # ==========================================================
 # 4. VERIFY & REPLACE (SECURE UPDATE)
 # ==========================================================
@@ -87,10 +233,59 @@ def verify_and_replace_face_route(
     """
     Verifies ownership before replacing existing biometric.
     """
-    verify_then_replace_face(
-        user_id=payload.user_id,
-        user_type=payload.user_type,
-        b64=payload.image_b64
-    )
+    _replace_face(payload, payload.image_b64)
 
     return success("Face biometric updated successfully")
+
+
+# ==========================================================
+# 5. TEMPLATE CACHE STATS (SIZING)
+# ==========================================================
+@router.get("/template-cache/stats")
+def template_cache_stats_route(
+    _=Depends(require_roles("ADMIN", "SUPER_ADMIN"))
+):
+    """
+    Hit / miss counters of the verification template cache
+    for this worker.
+    """
+    return success("Template cache stats", template_cache.stats())
+
+
+# ==========================================================
+# 6. BULK ENROLLMENT
+# ==========================================================
+@router.post("/bulk-enroll")
+def bulk_enroll_route(
+    archive: UploadFile = File(...),
+    dry_run: bool = False,
+    _=Depends(require_roles("ADMIN", "SUPER_ADMIN"))
+):
+    """
+    Starts a bulk enrollment job from a zip of <student_id>.jpg files.
+    Poll GET /face/bulk-enroll/{job_id} for progress and the report.
+    (CLI for server-side directories: python -m scripts.bulk_enroll)
+    """
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        shutil.copyfileobj(archive.file, tmp)
+
+    job = start_bulk_enrollment(tmp.name, dry_run=dry_run, cleanup=True)
+    return success("Bulk enrollment started", job.summary())
+
+
+@router.get("/bulk-enroll/{job_id}")
+def bulk_enroll_status_route(
+    job_id: str,
+    _=Depends(require_roles("ADMIN", "SUPER_ADMIN"))
+):
+    """
+    Progress of a bulk enrollment job; the per-file report is
+    included once the job has finished.
+    """
+    job = get_bulk_enrollment(job_id)
+    if job is None:
+        raise HTTPException(404, "Bulk enrollment job not found (jobs live in the worker that started them)")
+    return success(
+        "Bulk enrollment status",
+        job.summary(with_report=job.state in ("done", "failed"))
+    )
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from security.dependencies import require_roles
 from services.student_service import (
     register_student,
@@ -16,6 +17,7 @@ from schemas.api_request_models import (
     StudentFilterRequest,
     StudentFaceRegisterRequest      # ✅ NEW
 )
+from core.face_upload import read_face_upload
 
 # ... rest of the route file
 
@@ -53,11 +55,14 @@ def create_student(payload: StudentCreateRequest,_=Depends(require_roles("ADMIN"
 
 # ======================================================
 @router.post("/register-face")
-def register_student_face(payload: StudentFaceRegisterRequest,_=Depends(require_roles("STUDENT"))):
-
-    return register_student_face_service(
+async def register_student_face(request: Request,_=Depends(require_roles("STUDENT"))):
+    # JSON (image_b64 / face_token), multipart "image" file or raw image/jpeg
+    payload, image = await read_face_upload(request, StudentFaceRegisterRequest)
+    return await run_in_threadpool(
+        register_student_face_service,
         student_id=payload.student_id,
-        image_b64=payload.image_b64
+        image_b64=image,
+        face_token=payload.face_token
     )
 
 
@@ -71,7 +71,9 @@ class StudentCreateRequest(BaseModel):
 # 👤 STUDENT → REGISTER FACE AFTER LOGIN
 class StudentFaceRegisterRequest(BaseModel):
     student_id: str
-    image_b64: str
+    # Either a fresh image or the token from /face/validate
+    image_b64: Optional[str] = None
+    face_token: Optional[str] = None
 
 
 class StudentUpdateRequest(BaseModel):
@@ -159,16 +161,27 @@ class BatchRuleCreateRequest(BaseModel):
 class FaceReplaceRequest(BaseModel):
     user_id: str
     user_type: str
-    image_b64: str
+    # Either a fresh image or the token from /face/validate
+    image_b64: Optional[str] = None
+    face_token: Optional[str] = None
 
 
 class FaceVerifyRequest(BaseModel):
     user_id: str
-    image_b64: str
+    # Optional: multipart / raw image uploads send the bytes instead
+    image_b64: Optional[str] = None
 
 
 class FaceValidateRequest(BaseModel):
-    image_b64: str
+    image_b64: Optional[str] = None
+
+
+class FaceIdentifyRequest(BaseModel):
+    image_b64: Optional[str] = None
+
+
+class FaceFrameCheckRequest(BaseModel):
+    image_b64: Optional[str] = None
 
 
 # ================= REQUESTS =================
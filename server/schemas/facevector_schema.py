@@ -1,10 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional, Union
 
 class FaceVector(BaseModel):
     id: str = Field(alias="_id")
     user_id: str
-    embedding: List[float]
+    # BSON float32 vector (binary) or legacy list of doubles
+    embedding: Union[bytes, List[float]]
+    embedding_dtype: Optional[str] = None
+    embedding_scale: Optional[float] = None
 
     class Config:
         populate_by_name = True
@@ -0,0 +1,39 @@
+"""
+Offline all-pairs duplicate audit of face_vectors (e.g. after a model
+swap or a migration). Reports every pair at or above DUPLICATE_HIGH
+(search-score space, as at enrollment) and the clusters they form.
+
+Run from the server directory:
+    python -m scripts.audit_duplicate_faces [--threshold 0.65] [--block 2048]
+        [--workers 4] [--out duplicate_audit.json]
+"""
+import argparse
+import json
+import os
+
+from data.face_vectors_repo import face_vectors
+from services.duplicate_audit_service import audit_gallery
+from services.face_thresholds import DUPLICATE_HIGH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_HIGH)
+    parser.add_argument("--block", type=int, default=2048, help="rows per tile (memory ~ block^2 * 4 B per worker)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--out", default="duplicate_audit.json")
+    args = parser.parse_args()
+
+    report = audit_gallery(face_vectors, args.threshold, args.block, args.workers)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(f"✅ Audited {report['vectors']} face vectors in {report['timings_s']}")
+    print(f"   {len(report['pairs'])} suspected duplicate pairs in {len(report['clusters'])} clusters → {args.out}")
+    for cluster in report["clusters"][:10]:
+        print(f"   ❌ {cluster['size']} users, max score {cluster['max_score']}: {', '.join(cluster['user_ids'][:8])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+One-off backfill of 68-point landmarks for face_vectors enrolled before
+landmarks were stored with the vector.
+
+Run from the server directory (loads the face model in-process):
+    python -m scripts.backfill_landmarks [--limit N] [--dry-run]
+"""
+import argparse
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+
+from data.faces_repo import get_face_by_user
+from data.face_vectors_repo import get_vectors_missing_landmarks, set_vector_landmarks
+from services.face_service import extract_embedding_and_landmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=0, help="stop after N vectors (0 = all)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    # Materialize first: updates must not disturb the open cursor
+    pending = list(get_vectors_missing_landmarks(limit=args.limit))
+    print(f"{len(pending)} face vectors without landmarks")
+
+    done, failed = 0, []
+    for vec in pending:
+        face = get_face_by_user(vec["user_id"])
+        if not face or not face.get("image_data"):
+            failed.append((vec["_id"], "no stored face image"))
+            continue
+
+        img = cv2.imdecode(np.frombuffer(face["image_data"], np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            failed.append((vec["_id"], "stored image not decodable"))
+            continue
+
+        try:
+            _, lm = extract_embedding_and_landmarks(img)
+        except HTTPException as e:
+            failed.append((vec["_id"], e.detail))
+            continue
+
+        if not args.dry_run:
+            set_vector_landmarks(vec["_id"], lm)
+        done += 1
+        if done % 100 == 0:
+            print(f"  {done}/{len(pending)}")
+
+    print(f"✅ Backfilled {done} vectors{' (dry run)' if args.dry_run else ''}")
+    for vector_id, reason in failed:
+        print(f"❌ {vector_id}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
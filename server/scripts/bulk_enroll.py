@@ -0,0 +1,46 @@
+"""
+Bulk face enrollment from a zip or a directory of <student_id>.jpg files.
+
+Loads the face model in-process and writes a per-file CSV report.
+Run from the server directory:
+    python -m scripts.bulk_enroll <archive.zip | dir> [--report report.csv] [--dry-run]
+"""
+import argparse
+import csv
+import sys
+
+from services.bulk_enrollment_service import BulkEnrollmentJob
+
+
+def print_progress(job):
+    sys.stdout.write(
+        f"\r  {job.stage or 'finished':<10} {job.processed}/{job.total}"
+        f"  {job.counts()}"
+    )
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="zip archive or directory of <student_id>.jpg")
+    parser.add_argument("--report", default="bulk_enroll_report.csv")
+    parser.add_argument("--dry-run", action="store_true", help="everything except the database writes")
+    args = parser.parse_args()
+
+    job = BulkEnrollmentJob(args.source, dry_run=args.dry_run).run(on_progress=print_progress)
+    print()
+
+    with open(args.report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["file", "student_id", "status", "detail"])
+        writer.writeheader()
+        writer.writerows(job.report)
+
+    summary = job.summary()
+    if job.state != "done":
+        print(f"❌ Bulk enrollment failed: {job.error}")
+        sys.exit(1)
+    print(f"✅ {summary['counts']} in {summary['elapsed_s']}s → {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Converts legacy face_vectors.embedding arrays (BSON doubles) to the
+current storage format: a packed, L2-normalized float32 BSON vector, or
+the quantized form selected by Config.FACE_VECTOR_STORAGE_DTYPE.
+
+Idempotent and resumable; converted documents no longer match the query.
+Run from the server directory:
+    python -m scripts.migrate_face_vectors [--batch-size 500] [--dry-run]
+"""
+import argparse
+import time
+
+from pymongo import UpdateOne
+
+from config import Config
+from data.embedding_codec import decode_embedding, encode_embedding
+from data.face_vectors_repo import face_vectors
+
+LEGACY = {"embedding": {"$type": "array"}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    total = face_vectors.count_documents(LEGACY)
+    print(f"{total} legacy face vectors → {Config.FACE_VECTOR_STORAGE_DTYPE}")
+    if args.dry_run or not total:
+        return
+
+    t0 = time.perf_counter()
+    converted = 0
+    while True:
+        # Re-query each batch: converted docs drop out of LEGACY
+        batch = list(face_vectors.find(LEGACY, {"embedding": 1}, limit=args.batch_size))
+        if not batch:
+            break
+
+        ops = [
+            UpdateOne(
+                {"_id": doc["_id"], **LEGACY},
+                {"$set": encode_embedding(decode_embedding(doc))}
+            )
+            for doc in batch
+        ]
+        res = face_vectors.bulk_write(ops, ordered=False)
+        converted += res.modified_count
+        print(f"  {converted}/{total}")
+
+    print(f"✅ Converted {converted} face vectors in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
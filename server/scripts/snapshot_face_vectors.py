@@ -0,0 +1,29 @@
+"""
+Rebuilds the shared face gallery snapshot from face_vectors.
+
+Run from the server directory (e.g. nightly, so startup replay stays small):
+    python -m scripts.snapshot_face_vectors [--dir /var/lib/facesure/vectors]
+"""
+import argparse
+
+from config import Config
+from data.face_vectors_repo import face_vectors
+from data.vector_store import LocalVectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=Config.FACE_VECTOR_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    if not args.dir:
+        raise SystemExit("No snapshot directory (use --dir or Config.FACE_VECTOR_SNAPSHOT_DIR)")
+
+    store = LocalVectorStore(face_vectors, follow_changes=False, snapshot_dir=args.dir)
+    store.bulk_load()
+    count = store.write_snapshot(wait=True)
+    print(f"✅ Wrote snapshot of {count} face vectors to {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,10 @@ def get_current_user(authorization: str = Header(None)):
         raise HTTPException(HTTP_401_UNAUTHORIZED, "Invalid authorization format")
 
     token = authorization.split(" ")[1]
+    return user_from_access_token(token)
 
+
+def user_from_access_token(token: str):
     try:
         payload = decode_token(token)
     except Exception:
@@ -29,23 +32,37 @@ def get_current_user(authorization: str = Header(None)):
     return payload["sub"]
 
 
-def require_roles(*allowed_roles):
-    def wrapper(user_id=Depends(get_current_user)):
-        mapping = get_user_role(user_id)
-        if not mapping:
-            raise HTTPException(HTTP_403_FORBIDDEN, "User has no role assigned")
+def check_roles(user_id, allowed_roles):
+    mapping = get_user_role(user_id)
+    if not mapping:
+        raise HTTPException(HTTP_403_FORBIDDEN, "User has no role assigned")
 
-        role_doc = get_role_by_id(mapping["role_id"])
-        role_name = role_doc["name"]
+    role_doc = get_role_by_id(mapping["role_id"])
+    role_name = role_doc["name"]
 
-        if role_name not in allowed_roles:
-            raise HTTPException(HTTP_403_FORBIDDEN, "Access denied")
+    if role_name not in allowed_roles:
+        raise HTTPException(HTTP_403_FORBIDDEN, "Access denied")
 
-        return user_id
+    return user_id
+
+
+def require_roles(*allowed_roles):
+    def wrapper(user_id=Depends(get_current_user)):
+        return check_roles(user_id, allowed_roles)
 
     return wrapper
 
 
+def authorize_websocket(token: str, *allowed_roles):
+    """
+    require_roles for WebSockets: browsers cannot set an Authorization
+    header on the handshake, so the access token comes as a parameter.
+    """
+    if not token:
+        raise HTTPException(HTTP_401_UNAUTHORIZED, "Access token missing")
+    return check_roles(user_from_access_token(token), allowed_roles)
+
+
 def validate_refresh_token(refresh_token: str):
     if not refresh_token.startswith("Bearer "):
         raise HTTPException(HTTP_401_UNAUTHORIZED, "Invalid refresh token format")
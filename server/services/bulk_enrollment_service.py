@@ -0,0 +1,361 @@
+"""
+Bulk face enrollment from a zip archive or a directory of
+<student_id>.jpg / .jpeg / .png files.
+
+Pipeline: look up every student once, decode + embed files on a thread
+pool (cv2 and ONNX Runtime release the GIL, so this spreads over cores
+without loading the models twice), reject duplicates within the batch
+and against the gallery, then commit in chunks with bulk writes.
+"""
+import os
+import secrets
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+from config import Config
+from data.embedding_codec import normalize
+from data.student_repo import get_students_face_ids, set_student_face_ids
+from data.faces_repo import create_face_docs, delete_faces_by_users
+from data.face_vectors_repo import (
+    create_vectors,
+    delete_vectors,
+    search_similar_faces_many,
+    vector_transaction
+)
+from services.face_engine import face_engines
+from services.face_service import capture_face, capture_jpeg
+from services.face_template_cache import template_cache
+from services.face_thresholds import DUPLICATE_HIGH
+from services.face_metrics import stage, rejections
+from services.duplicate_audit_service import find_duplicate_pairs, cluster_pairs
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+# ==========================================================
+# SOURCES
+# ==========================================================
+def list_images(source):
+    """
+    ([(file name, student_id, reader)], archive) for a zip file or a
+    directory. The readers of a zip need its ZipFile (`archive`, None for
+    a directory) open; the caller closes it.
+    """
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(source, name)
+                entries.append((name, _student_id(name), _file_reader(path)))
+        return entries, None
+
+    archive = zipfile.ZipFile(source)
+    for info in sorted(archive.infolist(), key=lambda i: i.filename):
+        name = os.path.basename(info.filename)
+        if info.is_dir() or name.startswith(".") or not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        entries.append((info.filename, _student_id(name), _zip_reader(archive, info)))
+    return entries, archive
+
+
+def _student_id(name):
+    return os.path.splitext(os.path.basename(name))[0].strip()
+
+
+def _file_reader(path):
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+def _zip_reader(archive, info):
+    def read():
+        if info.file_size > Config.FACE_UPLOAD_MAX_BYTES:
+            raise HTTPException(413, "Image too large")
+        return archive.read(info)
+    return read
+
+
+# ==========================================================
+# JOB
+# ==========================================================
+class BulkEnrollmentJob:
+
+    def __init__(self, source, dry_run=False, cleanup=False):
+        self.id = secrets.token_hex(8)
+        self.source = source
+        self.dry_run = dry_run
+        # Delete `source` when done (uploaded archives)
+        self.cleanup = cleanup
+
+        self.state = "pending"
+        self.stage = None
+        self.total = 0
+        self.processed = 0
+        self.error = None
+        self.report = []
+        self.started_at = None
+        self.finished_at = None
+        self._on_progress = None
+        self._archive = None
+
+    # -----------------------------------------------------------
+    # REPORTING
+    # -----------------------------------------------------------
+    def _set(self, row, status, detail=None):
+        row["status"] = status
+        row["detail"] = detail
+
+    def _progress(self):
+        if self._on_progress:
+            self._on_progress(self)
+
+    def counts(self):
+        counts = {}
+        for row in self.report:
+            status = row.get("status") or "pending"
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def summary(self, with_report=False):
+        out = {
+            "job_id": self.id,
+            "state": self.state,
+            "stage": self.stage,
+            "dry_run": self.dry_run,
+            "total": self.total,
+            "processed": self.processed,
+            "counts": self.counts(),
+            "error": self.error,
+            "elapsed_s": round((self.finished_at or time.time()) - self.started_at, 1)
+            if self.started_at else None
+        }
+        if with_report:
+            out["report"] = self.report
+        return out
+
+    # -----------------------------------------------------------
+    # RUN
+    # -----------------------------------------------------------
+    def run(self, on_progress=None):
+        self._on_progress = on_progress
+        self.state = "running"
+        self.started_at = time.time()
+        try:
+            self._run()
+            self.state = "done"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print("[BULK-ENROLL] Job failed:", e)
+        finally:
+            self.finished_at = time.time()
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+            if self.cleanup:
+                try:
+                    os.unlink(self.source)
+                except OSError:
+                    pass
+            self._progress()
+        return self
+
+    def _run(self):
+        self.stage = "listing"
+        entries, self._archive = list_images(self.source)
+        self.total = len(entries)
+        self.report = [
+            {"file": name, "student_id": sid, "status": None, "detail": None}
+            for name, sid, _ in entries
+        ]
+
+        # 1. Students: one query for the whole batch
+        face_ids = get_students_face_ids({sid for _, sid, _ in entries})
+        seen = set()
+        todo = []
+        for i, (_, sid, reader) in enumerate(entries):
+            row = self.report[i]
+            if sid not in face_ids:
+                self._set(row, "not_found", "No such student")
+            elif face_ids[sid]:
+                self._set(row, "already_enrolled", "Use face replace for enrolled students")
+            elif sid in seen:
+                self._set(row, "duplicate_file", "Another file has the same student_id")
+            else:
+                seen.add(sid)
+                todo.append((i, reader))
+                continue
+            self.processed += 1
+        self._progress()
+
+        # 2. Decode + embed in parallel, once the models are up: a cold
+        # load outlasts _capture's 503 backoff (the CLI never started them)
+        self.stage = "embedding"
+        engine = face_engines.for_role("enroll")
+        engine.start(background=False)
+        if todo and not engine.wait():
+            raise RuntimeError(f"Face model not available: {engine.error}")
+        captures = {}
+        with ThreadPoolExecutor(max_workers=Config.FACE_BULK_WORKERS) as pool:
+            for i, result in zip(
+                (i for i, _ in todo),
+                pool.map(lambda item: self._capture(item[1]), todo)
+            ):
+                if isinstance(result, HTTPException):
+                    self._set(self.report[i], "rejected", result.detail)
+                    self.processed += 1
+                else:
+                    captures[i] = result
+                self._progress()
+
+        # 3. Duplicates, within the batch and against the gallery
+        self.stage = "duplicates"
+        accepted = self._dedupe(captures)
+        self.processed += len(captures) - len(accepted)
+        self._progress()
+
+        # 4. Commit
+        self.stage = "committing"
+        chunk = max(1, Config.FACE_BULK_COMMIT_CHUNK)
+        for start in range(0, len(accepted), chunk):
+            self._commit(accepted[start:start + chunk], captures)
+            self._progress()
+        self.stage = None
+
+    @staticmethod
+    def _capture(reader, retries=5):
+        for attempt in range(retries):
+            try:
+                return capture_face(reader())
+            except HTTPException as e:
+                # 503 = inference queue busy / model loading: back off
+                if e.status_code != 503 or attempt == retries - 1:
+                    return e
+                time.sleep(0.5 * (attempt + 1))
+            except Exception as e:
+                return HTTPException(500, str(e))
+
+    def _dedupe(self, captures):
+        order = sorted(captures)
+        if not order:
+            return []
+        emb = np.vstack([normalize(captures[i].embedding) for i in order])
+
+        # Within the batch: keep the first file of each duplicate group
+        # (tiled pair search, no n x n matrix)
+        first = {}
+        for group in cluster_pairs(find_duplicate_pairs(emb, DUPLICATE_HIGH)):
+            for j in group[1:]:
+                first[j] = group[0]
+        keep = [j for j in range(len(order)) if j not in first]
+        for j in sorted(first):
+            rejections.inc(reason="duplicate")
+            self._set(
+                self.report[order[j]], "duplicate",
+                f"Same face as {self.report[order[first[j]]]['student_id']} in this batch"
+            )
+
+        # Against the enrolled gallery
+        accepted = []
+        with stage("bulk_vector_search"):
+            matches = search_similar_faces_many([emb[j] for j in keep])
+        for j, hits in zip(keep, matches):
+            row = self.report[order[j]]
+            clash = next(
+                (m for m in hits
+                 if m.get("score", 0.0) >= DUPLICATE_HIGH and m["user_id"] != row["student_id"]),
+                None
+            )
+            if clash:
+                rejections.inc(reason="duplicate")
+                self._set(row, "duplicate", f"Face already registered to user {clash['user_id']}")
+            else:
+                accepted.append(order[j])
+        return accepted
+
+    @staticmethod
+    def _write(sids, indexes, captures, session):
+        vector_ids = [f"vec_{sid}" for sid in sids]
+        # Leftovers of a half-finished earlier enrollment
+        delete_vectors(vector_ids, session=session)
+        delete_faces_by_users(sids, session=session)
+
+        create_vectors(
+            [
+                (vid, sid, captures[i].embedding, captures[i].landmarks)
+                for vid, sid, i in zip(vector_ids, sids, indexes)
+            ],
+            session=session
+        )
+        face_ids = create_face_docs(
+            [
+                (sid, "STUDENT", capture_jpeg(captures[i]), vid)
+                for vid, sid, i in zip(vector_ids, sids, indexes)
+            ],
+            session=session
+        )
+        set_student_face_ids(dict(zip(sids, face_ids)), session=session)
+
+    def _commit(self, indexes, captures):
+        rows = [self.report[i] for i in indexes]
+        sids = [row["student_id"] for row in rows]
+
+        if self.dry_run:
+            for row in rows:
+                self._set(row, "ok", "dry run")
+            self.processed += len(rows)
+            return
+
+        try:
+            with stage("bulk_commit"), vector_transaction() as session:
+                # Students who registered a face themselves since the
+                # listing keep it: only the still-unenrolled are written
+                current = get_students_face_ids(sids, session=session)
+                taken = {sid for sid in sids if current.get(sid)}
+                if taken:
+                    keep = [k for k, sid in enumerate(sids) if sid not in taken]
+                    indexes = [indexes[k] for k in keep]
+                    sids = [sids[k] for k in keep]
+                if sids:
+                    self._write(sids, indexes, captures, session)
+        except PyMongoError as e:
+            for row in rows:
+                self._set(row, "error", f"Commit failed: {e}")
+            self.processed += len(rows)
+            return
+
+        for row in rows:
+            if row["student_id"] in taken:
+                self._set(row, "already_enrolled", "Registered a face while the job ran")
+            else:
+                template_cache.invalidate(row["student_id"])
+                self._set(row, "enrolled")
+        self.processed += len(rows)
+
+
+# ==========================================================
+# BACKGROUND JOBS (API)
+# ==========================================================
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_bulk_enrollment(source, dry_run=False, cleanup=False):
+    job = BulkEnrollmentJob(source, dry_run=dry_run, cleanup=cleanup)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    threading.Thread(target=job.run, name=f"bulk-enroll-{job.id}", daemon=True).start()
+    return job
+
+
+def get_bulk_enrollment(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
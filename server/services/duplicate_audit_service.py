@@ -0,0 +1,135 @@
+"""
+All-pairs duplicate-face audit over the whole face_vectors gallery.
+
+Pairs are found with a tiled Gram matrix: the normalized gallery is
+split into row blocks and every (i, j >= i) block pair is one matrix
+multiply, so peak extra memory is a single block x block tile per
+worker. Tiles run on a thread pool (BLAS releases the GIL).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import Config
+from data.embedding_codec import decode_embedding, normalize, EMBEDDING_FIELDS
+from data.vector_store import to_search_score
+from services.face_thresholds import DUPLICATE_HIGH
+
+
+def load_gallery(collection):
+    """(normalized float32 matrix, vector_ids, user_ids) of every face vector."""
+    vector_ids, user_ids, rows = [], [], []
+    for doc in collection.find({}, {"user_id": 1, **EMBEDDING_FIELDS}, batch_size=5000):
+        rows.append(normalize(decode_embedding(doc)))
+        vector_ids.append(doc["_id"])
+        user_ids.append(doc["user_id"])
+    if not rows:
+        return np.zeros((0, Config.FACE_VECTOR_DIM), dtype=np.float32), [], []
+    return np.vstack(rows), vector_ids, user_ids
+
+
+def _search_to_cos(score):
+    # DUPLICATE_HIGH is in search-score space, (1 + cos) / 2
+    return 2.0 * score - 1.0
+
+
+def find_duplicate_pairs(matrix, threshold=DUPLICATE_HIGH, block=2048, workers=4):
+    """
+    [(i, j, search_score)] for every i < j whose search score is at
+    least `threshold`, the same test enrollment applies.
+    """
+    n = matrix.shape[0]
+    cos_threshold = _search_to_cos(threshold)
+    starts = list(range(0, n, block))
+
+    def tile(i0):
+        found = []
+        a = matrix[i0:i0 + block]
+        for j0 in starts:
+            if j0 < i0:
+                continue
+            sims = a @ matrix[j0:j0 + block].T
+            hits = sims >= cos_threshold
+            if j0 == i0:
+                # Diagonal tile: only i < j (never zero the rest out, a
+                # threshold <= 0.5 would then match every zeroed cell)
+                hits &= np.triu(np.ones(hits.shape, dtype=bool), k=1)
+            ii, jj = np.nonzero(hits)
+            found.extend(
+                (i0 + int(i), j0 + int(j), float(to_search_score(sims[i, j])))
+                for i, j in zip(ii, jj)
+            )
+        return found
+
+    pairs = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for found in pool.map(tile, starts):
+            pairs.extend(found)
+    return pairs
+
+
+def cluster_pairs(pairs):
+    """Connected components of the duplicate graph: [[index, ...], ...]."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[rj] = ri
+
+    groups = {}
+    for x in parent:
+        groups.setdefault(find(x), []).append(x)
+    return sorted((sorted(g) for g in groups.values()), key=len, reverse=True)
+
+
+def audit_gallery(collection, threshold=DUPLICATE_HIGH, block=2048, workers=4):
+    t0 = time.perf_counter()
+    matrix, vector_ids, user_ids = load_gallery(collection)
+    t_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pairs = find_duplicate_pairs(matrix, threshold, block, workers)
+    # Several vectors of one user are not a duplicate identity
+    pairs = [p for p in pairs if user_ids[p[0]] != user_ids[p[1]]]
+    t_pairs = time.perf_counter() - t0
+
+    by_member = {}
+    for i, j, score in pairs:
+        by_member.setdefault(i, []).append(score)
+        by_member.setdefault(j, []).append(score)
+
+    clusters = []
+    for members in cluster_pairs(pairs):
+        scores = [s for m in members for s in by_member[m]]
+        clusters.append({
+            "size": len(members),
+            "max_score": round(max(scores), 4),
+            "user_ids": [user_ids[m] for m in members],
+            "vector_ids": [vector_ids[m] for m in members]
+        })
+
+    return {
+        "vectors": len(vector_ids),
+        "threshold": threshold,
+        "pairs": [
+            {
+                "user_a": user_ids[i],
+                "user_b": user_ids[j],
+                "vector_a": vector_ids[i],
+                "vector_b": vector_ids[j],
+                "score": round(score, 4)
+            }
+            for i, j, score in sorted(pairs, key=lambda p: p[2], reverse=True)
+        ],
+        "clusters": clusters,
+        "timings_s": {"load": round(t_load, 2), "pairs": round(t_pairs, 2)}
+    }
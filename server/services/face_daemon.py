@@ -0,0 +1,185 @@
+"""
+Shared face inference daemon.
+
+One local process owns the model pack and serves every API worker over a
+Unix domain socket, so HTTP workers can be scaled without multiplying
+model memory.
+
+Run from the server directory:
+    python -m services.face_daemon
+"""
+import os
+import threading
+from concurrent.futures import TimeoutError as InferenceTimeout
+from multiprocessing.connection import Client, Listener
+
+from insightface.app.common import Face
+
+from config import Config
+from services.face_inference import FaceInferenceBusy
+
+
+class FaceDaemonUnavailable(Exception):
+    """Raised when the inference daemon cannot be reached."""
+
+
+def _require_authkey(authkey):
+    if not authkey:
+        raise RuntimeError(
+            "Config.FACE_DAEMON_AUTHKEY must be set to a secret when FACE_DAEMON_SOCKET is used"
+        )
+    return authkey
+
+
+# ===============================================================
+# CLIENT (used inside API workers)
+# ===============================================================
+class FaceDaemonClient:
+    """
+    Drop-in replacement for FaceInferenceExecutor.analyze() / detect()
+    of one model profile. Each request thread keeps its own connection
+    to the daemon.
+    """
+
+    def __init__(self, address, authkey=Config.FACE_DAEMON_AUTHKEY, profile=Config.FACE_ENROLL_PROFILE):
+        self.address = address
+        self.authkey = _require_authkey(authkey)
+        self.profile = profile
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except OSError as e:
+                raise FaceDaemonUnavailable(str(e))
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def analyze(self, img, max_num=0, timeout=Config.FACE_INFERENCE_TIMEOUT_S, det_size=None):
+        return self._call(img, max_num, True, timeout, det_size)
+
+    def detect(self, img, max_num=0, timeout=Config.FACE_INFERENCE_TIMEOUT_S, det_size=None):
+        return self._call(img, max_num, False, timeout, det_size)
+
+    def _call(self, img, max_num, embed, timeout, det_size=None):
+        # One retry covers a daemon restart between two requests
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send((img, max_num, embed, self.profile, det_size))
+                # The daemon applies `timeout` itself; the margin lets its
+                # "timeout" reply arrive before we give up on the socket
+                replied = conn.poll(timeout + 1.0)
+                if replied:
+                    kind, payload = conn.recv()
+            except (OSError, EOFError) as e:
+                self._drop()
+                if attempt == 1:
+                    raise FaceDaemonUnavailable(str(e))
+                continue
+            # Outside the try: TimeoutError is an OSError (3.11+) and
+            # must not be retried as a broken connection
+            if not replied:
+                self._drop()
+                raise InferenceTimeout("Inference daemon timed out")
+            break
+
+        if kind == "busy":
+            raise FaceInferenceBusy()
+        if kind == "timeout":
+            # Same exception as the in-process executor: a 503, not a 500
+            raise InferenceTimeout(payload)
+        if kind == "error":
+            raise RuntimeError(payload)
+        return [Face(d) for d in payload]
+
+
+# ===============================================================
+# SERVER
+# ===============================================================
+def _serve_connection(conn, executors):
+    with conn:
+        while True:
+            try:
+                img, max_num, embed, profile, det_size = conn.recv()
+            except (OSError, EOFError):
+                return
+
+            try:
+                executor = executors.get(profile)
+                if executor is None:
+                    reply = ("error", f"Face profile '{profile}' is not served by this daemon")
+                elif embed:
+                    faces = executor.analyze(img, max_num=max_num, det_size=det_size)
+                    reply = ("ok", [dict(f) for f in faces])
+                else:
+                    faces = executor.detect(img, max_num=max_num, det_size=det_size)
+                    reply = ("ok", [dict(f) for f in faces])
+            except FaceInferenceBusy:
+                reply = ("busy", None)
+            except InferenceTimeout:
+                reply = ("timeout", "Inference timed out")
+            except Exception as e:
+                reply = ("error", str(e))
+
+            try:
+                conn.send(reply)
+            except (OSError, EOFError):
+                return
+
+
+def serve(address=Config.FACE_DAEMON_SOCKET, authkey=Config.FACE_DAEMON_AUTHKEY):
+    from services.face_inference import FaceModels, FaceInferenceExecutor
+    from services.face_engine import role_profiles
+
+    if not address:
+        raise SystemExit("Config.FACE_DAEMON_SOCKET is not set")
+    if not authkey:
+        raise SystemExit("Config.FACE_DAEMON_AUTHKEY is not set (shared secret for the socket)")
+
+    # Every profile the API roles use; same-pack profiles share sessions
+    executors = {}
+    for profile in sorted(set(role_profiles().values())):
+        models = FaceModels.from_profile(profile)
+        if Config.FACE_WARMUP:
+            models.warmup()
+        executors[profile] = FaceInferenceExecutor(models)
+        print(
+            f"[FACE-DAEMON] Startup ({profile}):",
+            ", ".join(f"{k}={v:.2f}s" for k, v in models.timings.items())
+        )
+
+    # A stale socket file from a crashed daemon blocks bind()
+    if os.path.exists(address):
+        os.unlink(address)
+
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        os.chmod(address, 0o660)
+        print(f"✅ Face inference daemon listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Failed handshake (wrong authkey etc.) must not stop the daemon
+                print("[FACE-DAEMON] Rejected connection:", e)
+                continue
+            threading.Thread(
+                target=_serve_connection,
+                args=(conn, executors),
+                daemon=True
+            ).start()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,142 @@
+import threading
+import time
+
+from config import Config
+from services.face_inference import FaceModels, FaceInferenceExecutor, profile_settings
+from services.face_daemon import FaceDaemonClient
+
+
+class FaceEngine:
+    """
+    Lifecycle of one model profile: idle → loading → ready | failed.
+
+    The API starts loading in the background at startup so non-face
+    routes are served immediately; face routes answer 503 until ready.
+    Code that never called start() (CLI scripts) loads synchronously on
+    first use.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.state = "idle"
+        self.error = None
+        self.models = None
+        self.executor = None
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._background = True
+
+    def start(self, background=True):
+        with self._lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+            self._background = background
+
+        if background:
+            threading.Thread(target=self._load, name=f"face-engine-{self.profile}", daemon=True).start()
+        else:
+            self._load()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.state == "ready"
+
+    def ensure_started(self):
+        """Executor if ready; loads in the foreground when nobody started us."""
+        if self.state == "idle":
+            self.start(background=False)
+        if self.state == "loading" and not self._background:
+            # Another thread is loading for us (concurrent first callers)
+            self._done.wait()
+        return self.executor if self.state == "ready" else None
+
+    def _load(self):
+        t_start = time.perf_counter()
+        try:
+            if Config.FACE_DAEMON_SOCKET:
+                # Models live (and warm up) in the shared inference daemon
+                self.executor = FaceDaemonClient(Config.FACE_DAEMON_SOCKET, profile=self.profile)
+            else:
+                models = FaceModels.from_profile(self.profile)
+                if Config.FACE_WARMUP:
+                    models.warmup()
+                self.timings.update(models.timings)
+                self.models = models
+                self.executor = FaceInferenceExecutor(models)
+            self.timings["total"] = time.perf_counter() - t_start
+            self.state = "ready"
+
+            phases = ", ".join(f"{k}={v:.2f}s" for k, v in self.timings.items())
+            print(f"✅ Face engine '{self.profile}' ready ({phases})")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"❌ Face model load failed ({self.profile}):", e)
+        finally:
+            self._done.set()
+
+    def status(self):
+        profile = profile_settings(self.profile)
+        return {
+            "state": self.state,
+            "mode": "daemon" if Config.FACE_DAEMON_SOCKET else "local",
+            "model": profile["model"],
+            "det_size": list(profile["det_size"]),
+            "timings_s": {k: round(v, 3) for k, v in self.timings.items()},
+            "error": self.error
+        }
+
+
+# ===============================================================
+# ENGINES PER ROLE
+# ===============================================================
+def role_profiles():
+    """{role: profile name}; "enroll" and "gate" must share an embedding space."""
+    roles = {"enroll": Config.FACE_ENROLL_PROFILE, "gate": Config.FACE_GATE_PROFILE}
+    spaces = {role: profile_settings(name)["embedding"] for role, name in roles.items()}
+    if spaces["enroll"] != spaces["gate"]:
+        raise ValueError(
+            f"Face profiles '{roles['enroll']}' ({spaces['enroll']}) and "
+            f"'{roles['gate']}' ({spaces['gate']}) produce incompatible embeddings"
+        )
+    return roles
+
+
+class FaceEngines:
+    """
+    One FaceEngine per profile in use. Enrollment and gate traffic pick
+    theirs by role; when both roles name the same profile they share it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+
+    def get(self, profile):
+        with self._lock:
+            engine = self._engines.get(profile)
+            if engine is None:
+                profile_settings(profile)
+                engine = self._engines[profile] = FaceEngine(profile)
+            return engine
+
+    def for_role(self, role):
+        return self.get(role_profiles()[role])
+
+    def start(self, background=True):
+        for profile in set(role_profiles().values()):
+            self.get(profile).start(background)
+
+    def status(self):
+        with self._lock:
+            engines = dict(self._engines)
+        profiles = {name: engine.status() for name, engine in engines.items()}
+        # Ready only when every profile in use is
+        states = {s["state"] for s in profiles.values()} or {"idle"}
+        state = next((s for s in ("failed", "loading", "idle") if s in states), "ready")
+        return {"state": state, "roles": role_profiles(), "profiles": profiles}
+
+
+face_engines = FaceEngines()
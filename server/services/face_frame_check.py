@@ -0,0 +1,96 @@
+"""
+Live framing feedback for the enrollment camera (POST /face/frame-check).
+
+Detection only, on the enroll profile at FACE_FRAME_CHECK_DET_SIZE, so
+the client can poll a few frames per second before it captures the
+registration photo. No embedding, no duplicate search, nothing stored.
+"""
+import numpy as np
+
+from config import Config
+from services.face_service import decode_image, decode_image_bytes, run_face_detection
+from services.face_quality import frame_quality_issue, MESSAGES as QUALITY_MESSAGES
+from services.face_metrics import stage
+
+HINTS = {
+    "ok": "Looks good. Hold still and capture.",
+    "no_face": "No face detected. Look at the camera.",
+    "multiple_faces": "Only you should be in the frame.",
+    "too_far": "Move closer to the camera.",
+    "too_close": "Move a little further from the camera.",
+    "off_center": "Center your face in the frame.",
+    "turn_to_camera": "Look straight at the camera.",
+    "low_confidence": "Face the camera with your face fully visible.",
+    **QUALITY_MESSAGES
+}
+
+
+def _yaw(kps):
+    """Nose offset from the eyes' midpoint, in eye distances (0 = frontal)."""
+    left_eye, right_eye, nose = kps[0], kps[1], kps[2]
+    eye_dist = float(np.linalg.norm(right_eye - left_eye))
+    if eye_dist <= 0:
+        return 1.0
+    return abs(float(nose[0] - (left_eye[0] + right_eye[0]) / 2)) / eye_dist
+
+
+def _framing_hint(face, w, h):
+    x1, y1, x2, y2 = (float(v) for v in face.bbox)
+    ratio = (x2 - x1) / w
+    if ratio < Config.FACE_FRAME_MIN_FACE_RATIO:
+        return "too_far"
+    if ratio > Config.FACE_FRAME_MAX_FACE_RATIO:
+        return "too_close"
+    dx = abs((x1 + x2) / 2 - w / 2) / w
+    dy = abs((y1 + y2) / 2 - h / 2) / h
+    if max(dx, dy) > Config.FACE_FRAME_MAX_OFFSET:
+        return "off_center"
+    if float(face.det_score) < Config.FACE_FRAME_MIN_DET_SCORE:
+        return "low_confidence"
+    if face.kps is not None and _yaw(face.kps) > Config.FACE_FRAME_MAX_YAW:
+        return "turn_to_camera"
+    return "ok"
+
+
+def check_frame(image):
+    """
+    Framing feedback for the enrollment camera: detection only, at
+    FACE_FRAME_CHECK_DET_SIZE. The box is relative to the frame (0-1).
+    Timed as the "frame_check" stage only, so preview polling stays out
+    of the enrollment decode / quality / detect metrics.
+    """
+    with stage("frame_check"):
+        return _check_frame(image)
+
+
+def _check_frame(image):
+    if isinstance(image, str):
+        img, src = decode_image(image, record=False)
+    else:
+        img, src = decode_image_bytes(image, record=False)
+    h, w = img.shape[:2]
+
+    result = {"faces": None, "box": None, "score": None}
+    # Same thresholds the registration photo will be held to
+    hint = frame_quality_issue(img, src, "enroll", record=False)
+    if hint is None:
+        faces = run_face_detection(
+            img, role="enroll", det_size=Config.FACE_FRAME_CHECK_DET_SIZE, record=False
+        )
+        result["faces"] = len(faces)
+        if not faces:
+            hint = "no_face"
+        elif len(faces) > 1:
+            hint = "multiple_faces"
+        else:
+            face = faces[0]
+            x1, y1, x2, y2 = (float(v) for v in face.bbox)
+            result["box"] = [
+                round(max(0.0, x1 / w), 4), round(max(0.0, y1 / h), 4),
+                round(min(1.0, x2 / w), 4), round(min(1.0, y2 / h), 4)
+            ]
+            result["score"] = round(float(face.det_score), 3)
+            hint = _framing_hint(face, w, h)
+
+    result.update({"ready": hint == "ok", "hint": hint, "message": HINTS[hint]})
+    return result
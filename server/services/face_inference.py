@@ -0,0 +1,402 @@
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import onnxruntime as ort
+
+from insightface.app.common import Face
+from insightface.utils import ensure_available, face_align
+from insightface.model_zoo.retinaface import RetinaFace
+from insightface.model_zoo.arcface_onnx import ArcFaceONNX
+from insightface.model_zoo.landmark import Landmark
+from insightface.model_zoo.attribute import Attribute
+
+from config import Config
+from services.face_metrics import stage, stage_seconds
+
+
+class FaceInferenceBusy(Exception):
+    """Raised when the inference queue is full."""
+
+
+# ===============================================================
+# ONNX SESSIONS
+# ===============================================================
+def build_session_options():
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = Config.FACE_ORT_INTRA_OP_THREADS
+    so.inter_op_num_threads = Config.FACE_ORT_INTER_OP_THREADS
+    so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return so
+
+
+def _cached_graph_path(onnx_file, cache_dir):
+    # Keyed by source file and ORT version: either changing invalidates it
+    st = os.stat(onnx_file)
+    stem = os.path.splitext(os.path.basename(onnx_file))[0]
+    key = f"{stem}-{st.st_size}-{int(st.st_mtime)}-ort{ort.__version__}.onnx"
+    return os.path.join(cache_dir, key)
+
+
+def open_session(onnx_file, cache_dir=Config.FACE_ORT_CACHE_DIR):
+    """
+    InferenceSession for `onnx_file`. With a cache dir, the first load
+    saves ORT's optimized graph there and later loads start from it.
+    """
+    providers = ["CPUExecutionProvider"]
+    if not cache_dir:
+        return ort.InferenceSession(onnx_file, sess_options=build_session_options(), providers=providers)
+
+    cache_dir = os.path.expanduser(cache_dir)
+    cached = _cached_graph_path(onnx_file, cache_dir)
+
+    if os.path.exists(cached):
+        try:
+            return ort.InferenceSession(cached, sess_options=build_session_options(), providers=providers)
+        except Exception as e:
+            print(f"[FACE-MODEL] Dropping unreadable cached graph {cached}:", e)
+            os.unlink(cached)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    so = build_session_options()
+    # Extended level: layout (NCHWc) rewrites are hardware specific and
+    # are re-applied cheaply at load time instead of being serialized
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    so.optimized_model_filepath = tmp
+    session = ort.InferenceSession(onnx_file, sess_options=so, providers=providers)
+    if os.path.exists(tmp):
+        # Atomic so concurrent workers never read a half-written graph
+        os.replace(tmp, cached)
+    return session
+
+
+def _route_model(onnx_file, session):
+    """Same routing rules as insightface's ModelRouter, but on our session."""
+    input_shape = session.get_inputs()[0].shape
+    outputs = session.get_outputs()
+
+    if len(outputs) >= 5:
+        return RetinaFace(model_file=onnx_file, session=session)
+    if input_shape[2] == 192 and input_shape[3] == 192:
+        return Landmark(model_file=onnx_file, session=session)
+    if input_shape[2] == 96 and input_shape[3] == 96:
+        return Attribute(model_file=onnx_file, session=session)
+    if (
+        input_shape[2] == input_shape[3]
+        and input_shape[2] >= 112
+        and input_shape[2] % 16 == 0
+    ):
+        return ArcFaceONNX(model_file=onnx_file, session=session)
+    return None
+
+
+# Model wrappers shared by every profile that loads the same ONNX file
+# (the detector input size is passed per call, see FaceModels.detect)
+_shared_models = {}
+_shared_lock = threading.Lock()
+
+
+def load_model(onnx_file, wanted=None):
+    """
+    Routed model for `onnx_file`, or None when it is not recognized or
+    `wanted(model)` is False (unwanted models are not kept in memory).
+    """
+    with _shared_lock:
+        model = _shared_models.get(onnx_file)
+        if model is None:
+            # model_file stays the original: ArcFaceONNX reads its graph
+            # to pick the input normalization
+            model = _route_model(onnx_file, open_session(onnx_file))
+            if model is None or (wanted and not wanted(model)):
+                return None
+            _shared_models[onnx_file] = model
+        elif wanted and not wanted(model):
+            return None
+        return model
+
+
+# ===============================================================
+# MODEL PACK
+# ===============================================================
+def profile_settings(name):
+    profile = Config.FACE_MODEL_PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"Unknown face model profile: {name}")
+    return profile
+
+
+class FaceModels:
+    """
+    The modules of an insightface model pack a profile asks for
+    (detection, recognition, landmarks ...) on sessions that use our
+    thread settings. See Config.FACE_MODEL_PROFILES.
+    """
+
+    def __init__(self, name, det_size, det_thresh=0.5, modules=None, rec_file=None):
+        # Seconds spent per startup phase, for the startup log / readiness
+        self.timings = {}
+        self.det_size = tuple(det_size)
+
+        t0 = time.perf_counter()
+        model_dir = ensure_available("models", name, root="~/.insightface")
+        self.timings["download"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+
+        def wanted(model):
+            if rec_file and model.taskname == "recognition":
+                return False
+            # Unused heads (genderage ...) would run on every face
+            return modules is None or model.taskname in modules
+
+        self.models = {}
+        for onnx_file in sorted(glob.glob(os.path.join(model_dir, "*.onnx"))):
+            model = load_model(onnx_file, wanted)
+            if model is not None and model.taskname not in self.models:
+                self.models[model.taskname] = model
+
+        if rec_file:
+            model = load_model(os.path.expanduser(rec_file))
+            if model is None or model.taskname != "recognition":
+                raise RuntimeError(f"{rec_file} is not a recognition model")
+            self.models["recognition"] = model
+
+        if "detection" not in self.models or "recognition" not in self.models:
+            raise RuntimeError(f"Model pack {name} has no detector/recognizer")
+
+        self.det = self.models["detection"]
+        self.rec = self.models["recognition"]
+        if self.det.input_size is not None:
+            # Detector exported with a fixed input shape
+            self.det_size = tuple(self.det.input_size)
+        self.det.prepare(-1, det_thresh=det_thresh)
+        self.rec.prepare(-1)
+
+        # Per-face heads other than recognition (landmarks, attributes)
+        self.heads = []
+        for taskname, model in self.models.items():
+            if taskname in ("detection", "recognition"):
+                continue
+            model.prepare(-1)
+            self.heads.append(model)
+
+        batch_dim = self.rec.session.get_inputs()[0].shape[0]
+        self.rec_batchable = not (isinstance(batch_dim, int) and batch_dim == 1)
+        self.timings["sessions"] = time.perf_counter() - t0
+
+    @classmethod
+    def from_profile(cls, name):
+        profile = profile_settings(name)
+        return cls(
+            profile["model"],
+            profile["det_size"],
+            modules=profile.get("modules"),
+            rec_file=profile.get("rec_file")
+        )
+
+    def warmup(self, max_batch=Config.FACE_MAX_BATCH):
+        """
+        Runs every session once on a synthetic frame so ORT's lazy
+        allocations happen here and not on the first real request.
+        """
+        t0 = time.perf_counter()
+        w, h = self.det_size
+        img = np.full((h, w, 3), 127, dtype=np.uint8)
+        self.det.detect(img, input_size=self.det_size, max_num=0, metric="default")
+        if Config.FACE_PREFILTER_ENABLED:
+            self.det.detect(img, input_size=Config.FACE_PREFILTER_DET_SIZE, max_num=0, metric="default")
+
+        # A fake face in the middle of the frame for the per-face heads
+        size = self.rec.input_size[0]
+        ox, oy = (w - size) / 2, (h - size) / 2
+        kps = face_align.arcface_dst * (size / 112.0) + np.array([ox, oy], dtype=np.float32)
+        face = Face(
+            bbox=np.array([ox, oy, ox + size, oy + size], dtype=np.float32),
+            kps=kps,
+            det_score=1.0
+        )
+        for head in self.heads:
+            head.get(img, face)
+
+        crop = self.align(img, face)
+        self.embed([crop])
+        if self.rec_batchable and max_batch > 1:
+            self.embed([crop] * max_batch)
+        self.timings["warmup"] = time.perf_counter() - t0
+
+    def detect(self, img, max_num=0, det_size=None):
+        """`det_size` overrides the profile's detector input (cascade crops)."""
+        bboxes, kpss = self.det.detect(
+            img,
+            input_size=tuple(det_size) if det_size else self.det_size,
+            max_num=max_num,
+            metric="default"
+        )
+        faces = []
+        for i in range(bboxes.shape[0]):
+            faces.append(Face(
+                bbox=bboxes[i, 0:4],
+                kps=kpss[i] if kpss is not None else None,
+                det_score=bboxes[i, 4]
+            ))
+        return faces
+
+    def align(self, img, face):
+        return face_align.norm_crop(
+            img,
+            landmark=face.kps,
+            image_size=self.rec.input_size[0]
+        )
+
+    def embed(self, crops):
+        if self.rec_batchable:
+            return self.rec.get_feat(crops)
+        return np.vstack([self.rec.get_feat(c) for c in crops])
+
+
+# ===============================================================
+# INFERENCE EXECUTOR
+# ===============================================================
+class _Job:
+    __slots__ = ("img", "max_num", "embed", "det_size", "future", "queued_at")
+
+    def __init__(self, img, max_num, embed=True, det_size=None):
+        self.img = img
+        self.max_num = max_num
+        # False: detection only (boxes, kps, scores), no heads / recognition
+        self.embed = embed
+        self.det_size = det_size
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class FaceInferenceExecutor:
+    """
+    Fixed pool of inference threads fed by a bounded queue.
+
+    A worker that picks up a frame waits up to FACE_BATCH_WINDOW_MS for
+    more frames, runs detection and landmarks per frame, then runs the
+    recognition session once for every face in the batch.
+    """
+
+    def __init__(
+        self,
+        models,
+        workers=Config.FACE_INFERENCE_WORKERS,
+        queue_size=Config.FACE_INFERENCE_QUEUE_SIZE,
+        batch_window_ms=Config.FACE_BATCH_WINDOW_MS,
+        max_batch=Config.FACE_MAX_BATCH
+    ):
+        self.models = models
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+
+        for i in range(max(1, workers)):
+            t = threading.Thread(
+                target=self._run,
+                name=f"face-inference-{i}",
+                daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    # -----------------------------------------------------------
+    # PUBLIC API
+    # -----------------------------------------------------------
+    def submit(self, img, max_num=0, embed=True, det_size=None):
+        job = _Job(img, max_num, embed, det_size)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise FaceInferenceBusy()
+        return job.future
+
+    def analyze(self, img, max_num=0, timeout=Config.FACE_INFERENCE_TIMEOUT_S, det_size=None):
+        return self.submit(img, max_num, det_size=det_size).result(timeout=timeout)
+
+    def detect(self, img, max_num=0, timeout=Config.FACE_INFERENCE_TIMEOUT_S, det_size=None):
+        return self.submit(img, max_num, embed=False, det_size=det_size).result(timeout=timeout)
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    # -----------------------------------------------------------
+    # WORKER LOOP
+    # -----------------------------------------------------------
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                # Keep the shutdown sentinel for the next loop
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._process(batch)
+
+    def _process(self, batch):
+        done = []
+        crops = []
+        owners = []
+
+        for job in batch:
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            stage_seconds.observe(time.perf_counter() - job.queued_at, stage="queue_wait")
+            try:
+                with stage("detection"):
+                    faces = self.models.detect(job.img, job.max_num, job.det_size)
+                if not job.embed:
+                    job.future.set_result(faces)
+                    continue
+                with stage("landmarks"):
+                    for face in faces:
+                        for head in self.models.heads:
+                            head.get(job.img, face)
+                        crops.append(self.models.align(job.img, face))
+                        owners.append(face)
+                done.append((job, faces))
+            except Exception as e:
+                job.future.set_exception(e)
+
+        if crops:
+            try:
+                with stage("embedding"):
+                    embeddings = self.models.embed(crops)
+            except Exception as e:
+                for job, _ in done:
+                    job.future.set_exception(e)
+                return
+            for face, emb in zip(owners, embeddings):
+                face.embedding = emb.flatten()
+
+        for job, faces in done:
+            job.future.set_result(faces)
@@ -0,0 +1,68 @@
+"""
+Face pipeline instrumentation, scraped from GET /metrics.
+
+face_stage_seconds{stage}          duration per pipeline stage:
+    decode, decode_full              image decode (reduced / full resolution)
+    quality                          pre-inference quality gate
+    prefilter                        cascade first stage (BlazeFace)
+    frame_check                      /face/frame-check preview, end to end (its decode,
+                                     quality and detect are not counted above)
+    analyze, detect                  API-side inference call, incl. queue wait
+    queue_wait, detection,           inside the inference executor (in the
+    landmarks, embedding             daemon process when FACE_DAEMON_SOCKET is set)
+    template_load                    template cache miss → DB
+    landmark_check                   twin / spoof landmark comparison
+    vector_search, db_commit         enrollment duplicate search and save
+    bulk_vector_search, bulk_commit  bulk enrollment, per batch / chunk
+face_frames_total{role, faces}     frames analyzed by faces found (0, 1, 2, 3+); snapshot
+                                   captures keep the main face only (max_num=1), so
+                                   2+ comes from the stream's whole-frame search
+face_rejections_total{reason}      no_face, multiple_faces (cascade prefilter), ambiguous_twin, duplicate,
+                                   and the quality gate's low_resolution, blurry,
+                                   too_dark, too_bright, poor_exposure
+face_match_score{kind}             cosine of verify (1:1) and identify (best 1:N)
+face_match_decisions_total{kind, result}
+face_stream_frames_total{outcome}  /face/verify/stream frames by quality gate outcome
+"""
+from utils.metrics import registry
+
+STAGE_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075,
+    0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Cosine, 0.05 wide, so VERIFY_THRESHOLD / DUPLICATE_HIGH can be tuned
+SCORE_BUCKETS = tuple(round(0.05 * i, 2) for i in range(-4, 21))
+
+stage_seconds = registry.histogram(
+    "face_stage_seconds", "Duration of one face pipeline stage in seconds",
+    STAGE_BUCKETS, labels=("stage",)
+)
+frames = registry.counter(
+    "face_frames_total", "Frames analyzed, by model role and number of faces found",
+    labels=("role", "faces")
+)
+rejections = registry.counter(
+    "face_rejections_total", "Face captures rejected, by reason",
+    labels=("reason",)
+)
+match_scores = registry.histogram(
+    "face_match_score", "Cosine similarity against the matched template",
+    SCORE_BUCKETS, labels=("kind",)
+)
+decisions = registry.counter(
+    "face_match_decisions_total", "Match decisions (accept, reject, ambiguous, ...)",
+    labels=("kind", "result")
+)
+stream_frames = registry.counter(
+    "face_stream_frames_total", "Gate stream frames by quality gate outcome",
+    labels=("outcome",)
+)
+
+
+def stage(name):
+    """with stage("decode"): ... records the block's duration."""
+    return stage_seconds.time(stage=name)
+
+
+def count_faces(role, n):
+    frames.inc(role=role, faces=str(n) if n < 3 else "3+")
@@ -0,0 +1,118 @@
+"""
+Cheap first stage of the face detector cascade (MediaPipe BlazeFace).
+
+Runs on a small copy of the frame in the request thread, confirms that
+exactly one face is present and returns a padded crop box around it.
+The heavy detector and recognizer then only see that crop, at
+FACE_PREFILTER_DET_SIZE instead of the profile's full detector size.
+Disabled (single-stage pipeline) when mediapipe is not installed.
+"""
+import threading
+
+import cv2
+from fastapi import HTTPException
+
+try:
+    import mediapipe as mp
+except ImportError:
+    mp = None
+
+from config import Config
+from services.face_metrics import stage, rejections
+
+
+class FacePrefilter:
+
+    def __init__(
+        self,
+        model_selection=Config.FACE_PREFILTER_MODEL,
+        min_confidence=Config.FACE_PREFILTER_MIN_CONFIDENCE,
+        max_side=Config.FACE_PREFILTER_MAX_SIDE
+    ):
+        self.model_selection = model_selection
+        self.min_confidence = min_confidence
+        self.max_side = max_side
+        # MediaPipe graphs are not thread-safe: one per request thread
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = mp.solutions.face_detection.FaceDetection(
+                model_selection=self.model_selection,
+                min_detection_confidence=self.min_confidence
+            )
+            self._local.detector = detector
+        return detector
+
+    def detect(self, img):
+        """[(x1, y1, x2, y2, score)] in frame pixels, largest first."""
+        h, w = img.shape[:2]
+        f = min(1.0, self.max_side / max(h, w))
+        small = cv2.resize(img, (round(w * f), round(h * f)), interpolation=cv2.INTER_AREA) if f < 1 else img
+        result = self._detector().process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+
+        boxes = []
+        for d in result.detections or []:
+            rb = d.location_data.relative_bounding_box
+            boxes.append((
+                max(0.0, rb.xmin * w),
+                max(0.0, rb.ymin * h),
+                min(float(w), (rb.xmin + rb.width) * w),
+                min(float(h), (rb.ymin + rb.height) * h),
+                float(d.score[0])
+            ))
+        return sorted(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+
+
+prefilter = FacePrefilter() if mp is not None and Config.FACE_PREFILTER_ENABLED else None
+if mp is None and Config.FACE_PREFILTER_ENABLED:
+    print("❌ mediapipe not installed, face detector cascade disabled")
+
+
+def is_rival(main_width, width):
+    """
+    A second face counts as another person when it is at least
+    FACE_PREFILTER_RIVAL_RATIO of the main face's width; smaller ones
+    are people in the background. Both cascade stages use this rule.
+    """
+    return width >= Config.FACE_PREFILTER_RIVAL_RATIO * main_width
+
+
+def prefilter_crop(img):
+    """
+    Padded (x1, y1, x2, y2) crop around the only face in `img`, or None
+    when the cascade is off. Raises 400 for zero or several faces.
+    """
+    if prefilter is None:
+        return None
+
+    with stage("prefilter"):
+        boxes = prefilter.detect(img)
+    if not boxes:
+        rejections.inc(reason="no_face")
+        raise HTTPException(
+            status_code=400,
+            detail="No face detected. Ensure your face is visible."
+        )
+
+    # The heavy stage applies the same is_rival rule inside the crop
+    x1, y1, x2, y2, _ = boxes[0]
+    width = x2 - x1
+    rivals = [b for b in boxes[1:] if is_rival(width, b[2] - b[0])]
+    if rivals:
+        rejections.inc(reason="multiple_faces")
+        raise HTTPException(
+            status_code=400,
+            detail="Multiple faces detected. Only one person allowed."
+        )
+
+    pad = Config.FACE_PREFILTER_PAD
+    h, w = img.shape[:2]
+    bw, bh = x2 - x1, y2 - y1
+    return (
+        max(0, int(x1 - bw * pad)),
+        max(0, int(y1 - bh * pad)),
+        min(w, int(x2 + bw * pad)),
+        min(h, int(y2 + bh * pad))
+    )
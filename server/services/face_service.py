@@ -1,78 +1,205 @@
 import cv2
 import base64
 import numpy as np
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import TimeoutError as InferenceTimeout
 from datetime import datetime
 from pymongo.errors import PyMongoError
 from fastapi import HTTPException, status
 
-from insightface.app import FaceAnalysis
-
-from extensions.mongo import client, db
+from config import Config
+from extensions.mongo import db
+from utils.image_utils import read_image_header, reduction_factor, gray_preview, REDUCED_FLAGS
 from data.faces_repo import (
     get_face_by_user,
+    get_face_ref_by_user,
     delete_face,
     create_face_doc
 )
+from data.embedding_codec import (
+    normalize,
+    decode_embedding,
+    decode_landmarks,
+    cosine_similarity
+)
 from data.face_vectors_repo import (
     get_vector,
     create_vector,
     delete_vector,
-    search_similar_faces
+    search_similar_faces,
+    vector_transaction
+)
+from services.face_inference import FaceInferenceBusy
+from services.face_daemon import FaceDaemonUnavailable
+from services.face_engine import face_engines
+from services.face_metrics import stage, count_faces, rejections, match_scores, decisions
+from services.face_quality import ensure_frame_quality
+from services.face_prefilter import prefilter_crop, is_rival
+from services.face_template_cache import FaceTemplate, template_cache
+from services.face_thresholds import (
+    VERIFY_THRESHOLD,
+    DUPLICATE_HIGH,
+    AMBIGUOUS_LOW,
+    LANDMARK_TWIN_THRESHOLD
 )
 
 # ===============================================================
-# MODEL INITIALIZATION
+# IMAGE DECODER
 # ===============================================================
-try:
-    face_model = FaceAnalysis(name="buffalo_l")
-    face_model.prepare(ctx_id=-1, det_size=(640, 640))
-except Exception as e:
-    print("❌ Face model load failed:", e)
-    face_model = None
+# Encoded bytes behind a decoded frame and the factor it was reduced by,
+# so recognition can go back to full resolution when it needs to, and a
+# small grayscale preview for the quality gate (services.face_quality)
+ImageSource = namedtuple("ImageSource", ["data", "scale", "preview"], defaults=(None,))
 
 
-# ===============================================================
-# THRESHOLDS (UNCHANGED)
-# ===============================================================
-VERIFY_THRESHOLD = 0.55
-DUPLICATE_HIGH = 0.65
-AMBIGUOUS_LOW = 0.50
-LANDMARK_TWIN_THRESHOLD = 18.0
+def _invalid_image():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid or corrupted image"
+    )
 
 
-# ===============================================================
-# IMAGE DECODER
-# ===============================================================
-def decode_image(b64):
+def _image_too_large(detail="Image too large"):
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=detail
+    )
+
+
+def decode_image(b64, record=True):
+    # base64 is 4/3 of the payload; refuse before decoding anything
+    if len(b64) > Config.FACE_UPLOAD_MAX_BYTES * 4 // 3 + 64:
+        raise _image_too_large()
     try:
         if "," in b64:
             b64 = b64.split(",")[1]
         img_bytes = base64.b64decode(b64)
-        arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError()
-        return img, None
     except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or corrupted image"
-        )
+        raise _invalid_image()
+    return decode_image_bytes(img_bytes, record)
+
+
+def decode_image_bytes(img_bytes, record=True):
+    """`record=False` leaves the frame out of the decode stage metric."""
+    if len(img_bytes) > Config.FACE_UPLOAD_MAX_BYTES:
+        raise _image_too_large()
+
+    arr = np.frombuffer(img_bytes, np.uint8)
+    header = read_image_header(arr)
+
+    factor = 1
+    if header is not None:
+        fmt, w, h = header
+        if w == 0 or h == 0:
+            raise _invalid_image()
+        if max(w, h) > Config.FACE_IMAGE_MAX_SIDE or w * h > Config.FACE_IMAGE_MAX_PIXELS:
+            raise _image_too_large("Image dimensions too large")
+        if fmt == "jpeg":
+            factor = reduction_factor(w, h, Config.FACE_DECODE_MIN_SIDE)
+
+    try:
+        with stage("decode") if record else nullcontext():
+            img = cv2.imdecode(arr, REDUCED_FLAGS.get(factor, cv2.IMREAD_COLOR))
+    except cv2.error:
+        img = None
+    if img is None:
+        raise _invalid_image()
+
+    if header is None and img.shape[0] * img.shape[1] > Config.FACE_IMAGE_MAX_PIXELS:
+        raise _image_too_large("Image dimensions too large")
+
+    # imdecode applies EXIF orientation, so the header's width may be the
+    # decoded height: the libjpeg reduction is the scale either way
+    scale = float(factor)
+    return img, ImageSource(arr, scale, gray_preview(img, Config.FACE_QUALITY_PREVIEW_SIDE))
+
+
+def decode_full_resolution(src):
+    with stage("decode_full"):
+        img = cv2.imdecode(src.data, cv2.IMREAD_COLOR)
+    if img is None:
+        raise _invalid_image()
+    return img
 
 
 # ===============================================================
 # 🚨 FACE COUNT ENFORCEMENT (NEW)
 # ===============================================================
-def ensure_single_face(img):
-    faces = face_model.get(img,max_num=1)
+# `role` picks the model profile: "enroll" (Config.FACE_ENROLL_PROFILE)
+# or "gate" (Config.FACE_GATE_PROFILE). `det_size` overrides the
+# profile's detector input size (cascade crops). `record=False` keeps
+# the call out of the detect / analyze stage and face_frames_total.
+def run_face_analysis(img, max_num=0, role="enroll", det_size=None):
+    return _run_inference(img, max_num, embed=True, role=role, det_size=det_size)
+
+
+def run_face_detection(img, max_num=0, role="enroll", det_size=None, record=True):
+    """Boxes / kps / det scores only: no landmarks or recognition."""
+    return _run_inference(img, max_num, embed=False, role=role, det_size=det_size, record=record)
+
+
+def _run_inference(img, max_num, embed, role, det_size=None, record=True):
+    engine = face_engines.for_role(role)
+    executor = engine.ensure_started()
+    if executor is None:
+        if engine.state == "loading":
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Face model is still loading. Please retry.",
+                headers={"Retry-After": "5"}
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face model not available"
+        )
+    try:
+        with stage("analyze" if embed else "detect") if record else nullcontext():
+            if embed:
+                faces = executor.analyze(img, max_num=max_num, det_size=det_size)
+            else:
+                faces = executor.detect(img, max_num=max_num, det_size=det_size)
+        if record:
+            count_faces(role, len(faces))
+        return faces
+    except FaceInferenceBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face service busy. Please retry."
+        )
+    except FaceDaemonUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face inference daemon unavailable"
+        )
+    except InferenceTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face service timed out. Please retry."
+        )
+
+
+def ensure_single_face(img, role="enroll", det_size=None, rivals=False):
+    """
+    The main face in `img`. Other faces are ignored, unless `rivals`
+    (cascade crops): then one passing face_prefilter.is_rival is
+    rejected, as the prefilter would.
+    """
+    faces = run_face_analysis(img, max_num=2 if rivals else 1, role=role, det_size=det_size)
+    if rivals and len(faces) > 1:
+        widths = sorted((float(f.bbox[2] - f.bbox[0]) for f in faces), reverse=True)
+        if not is_rival(widths[0], widths[1]):
+            faces = faces[:1]
 
     if not faces:
+        rejections.inc(reason="no_face")
         raise HTTPException(
             status_code=400,
             detail="No face detected. Ensure your face is visible."
         )
 
     if len(faces) > 1:
+        rejections.inc(reason="multiple_faces")
         raise HTTPException(
             status_code=400,
             detail="Multiple faces detected. Only one person allowed."
@@ -84,59 +211,168 @@ def ensure_single_face(img):
 # ===============================================================
 # EMBEDDING EXTRACTION (UNCHANGED LOGIC)
 # ===============================================================
-def extract_embedding_and_landmarks(img):
-    face = ensure_single_face(img)
+def extract_embedding_and_landmarks(img, src=None, role="enroll"):
+    """
+    `src` is the ImageSource from decode_image. Landmarks are returned in
+    original-resolution pixels so they stay comparable across uploads.
+    """
+    # Cascade: the cheap detector rejects no face / rival faces and picks the crop
+    box = prefilter_crop(img)
+    face = _single_face_in(img, box, role)
+
+    scale = src.scale if src is not None else 1.0
+    if scale > 1 and face.bbox[2] - face.bbox[0] < Config.FACE_MIN_REC_FACE_PX:
+        # Face too small in the reduced frame for good recognition
+        full = decode_full_resolution(src)
+        if box is not None:
+            # Per axis from the decoded shapes, which both carry the EXIF
+            # orientation (libjpeg rounds reduced sizes up)
+            sx = full.shape[1] / img.shape[1]
+            sy = full.shape[0] / img.shape[0]
+            x1, y1, x2, y2 = box
+            box = (
+                int(x1 * sx), int(y1 * sy),
+                min(int(x2 * sx), full.shape[1]), min(int(y2 * sy), full.shape[0])
+            )
+        face = _single_face_in(full, box, role)
+        scale = 1.0
 
     emb = face.embedding.astype(np.float32)
-    lm = face.landmark_3d_68.astype(np.float32)
+    lm = face.landmark_3d_68.astype(np.float32) * np.float32(scale)
 
     return emb, lm
 
 
+def _single_face_in(img, box, role):
+    """ensure_single_face on the crop `box` (None = whole frame), in `img` pixels."""
+    if box is None:
+        return ensure_single_face(img, role)
+
+    x1, y1, x2, y2 = box
+    face = ensure_single_face(
+        img[y1:y2, x1:x2], role, det_size=Config.FACE_PREFILTER_DET_SIZE, rivals=True
+    )
+    offset = np.array([x1, y1], dtype=np.float32)
+    face.bbox = face.bbox + np.tile(offset, 2)
+    if face.kps is not None:
+        face.kps = face.kps + offset
+    if face.landmark_3d_68 is not None:
+        face.landmark_3d_68 = face.landmark_3d_68 + np.array([x1, y1, 0], dtype=np.float32)
+    return face
+
+
+# Decoded frame plus what recognition extracted from it. `jpeg` is set
+# when the encoded image already exists (validated face tokens); `img`
+# may then be None.
+FaceCapture = namedtuple("FaceCapture", ["img", "embedding", "landmarks", "jpeg"], defaults=(None,))
+
+
+def capture_face(image, role="enroll"):
+    """`image` is base64 (JSON bodies) or the raw encoded bytes (binary uploads)."""
+    if isinstance(image, str):
+        img, src = decode_image(image)
+    else:
+        img, src = decode_image_bytes(image)
+    # Blurry / dark / tiny frames never reach the models
+    ensure_frame_quality(img, src, role)
+    emb, lm = extract_embedding_and_landmarks(img, src, role)
+    return FaceCapture(img, emb, lm)
+
+
+def capture_jpeg(capture):
+    if capture.jpeg is not None:
+        return capture.jpeg
+    ok, buf = cv2.imencode(".jpg", capture.img)
+    return buf.tobytes()
+
+
 def landmark_distance(a, b):
     return float(np.linalg.norm(a.flatten() - b.flatten()))
 
 
+def align_landmarks(lm, reference):
+    """
+    `lm` moved and scaled onto `reference`: same centroid and the same
+    spread (RMS distance to the centroid in x/y), so the distance to it
+    is in `reference` pixels whatever resolution `lm` was taken at.
+    """
+    lm = lm.astype(np.float32)
+    c, c_ref = lm.mean(axis=0), reference.mean(axis=0)
+    spread = np.sqrt(((lm[:, :2] - c[:2]) ** 2).sum(axis=1).mean())
+    spread_ref = np.sqrt(((reference[:, :2] - c_ref[:2]) ** 2).sum(axis=1).mean())
+    return (lm - c) * np.float32(spread_ref / max(spread, 1e-6)) + c_ref
+
+
 # ===============================================================
 # VERIFICATION
 # ===============================================================
-def verify_face_for_user(user_id, b64):
-    face = get_face_by_user(user_id)
-    if not face:
-        raise HTTPException(404, "Face not registered")
-
-    vector = get_vector(face["vector_ref"])
+def load_face_template(user_id):
+    template = template_cache.get(user_id)
+    if template is not None:
+        return template
+
+    with stage("template_load"):
+        face = get_face_ref_by_user(user_id)
+        if not face:
+            raise HTTPException(404, "Face not registered")
+        vector = get_vector(face["vector_ref"])
     if not vector:
         raise HTTPException(500, "Stored face vector missing")
 
-    saved_emb = np.array(vector["embedding"], np.float32)
+    template = FaceTemplate(
+        user_id=user_id,
+        vector_ref=face["vector_ref"],
+        embedding=normalize(decode_embedding(vector)),
+        landmarks=decode_landmarks(vector)
+    )
+    template_cache.put(template)
+    return template
 
-    img, _ = decode_image(b64)
-    emb, lm1 = extract_embedding_and_landmarks(img)
 
-    score = float(
-        np.dot(saved_emb, emb)
-        / (np.linalg.norm(saved_emb) * np.linalg.norm(emb))
-    )
+def verify_face_for_user(user_id, b64):
+    template = load_face_template(user_id)
+    return match_template(template, capture_face(b64, role="gate"))
+
 
-    print(f"[VERIFY] {user_id} | score={score:.3f}")
+def match_template(template, capture):
+    """
+    1:1 decision used by every gate path (verify, stream, identify) and
+    face replace. The twin check aligns the capture's landmarks onto the
+    template's first, so camera resolution and framing don't matter.
+    """
+    score = cosine_similarity(template.embedding, capture.embedding)
+
+    print(f"[VERIFY] {template.user_id} | score={score:.3f}")
+    match_scores.observe(score, kind="verify")
 
     if score < VERIFY_THRESHOLD:
+        decisions.inc(kind="verify", result="reject")
         return False, score
 
     if score < DUPLICATE_HIGH:
-        img2 = cv2.imdecode(
-            np.frombuffer(face["image_data"], np.uint8),
-            cv2.IMREAD_COLOR
-        )
-        _, lm2 = extract_embedding_and_landmarks(img2)
+        with stage("landmark_check"):
+            lm2 = template.landmarks
+            if lm2 is None:
+                # Enrolled before landmarks were persisted (see
+                # scripts.backfill_landmarks): recompute from the stored image
+                face = get_face_by_user(template.user_id)
+                img2 = cv2.imdecode(
+                    np.frombuffer(face["image_data"], np.uint8),
+                    cv2.IMREAD_COLOR
+                )
+                _, lm2 = extract_embedding_and_landmarks(img2)
 
-        if landmark_distance(lm1, lm2) > LANDMARK_TWIN_THRESHOLD:
+            lm1 = align_landmarks(capture.landmarks, lm2)
+            twin = landmark_distance(lm1, lm2) > LANDMARK_TWIN_THRESHOLD
+        if twin:
+            rejections.inc(reason="ambiguous_twin")
+            decisions.inc(kind="verify", result="ambiguous")
             raise HTTPException(
                 status_code=403,
                 detail="Identity ambiguous (Twin or spoof detected)"
             )
 
+    decisions.inc(kind="verify", result="accept")
     return True, score
 
 
@@ -144,13 +380,17 @@ def verify_face_for_user(user_id, b64):
 # SAVE / REPLACE FACE (UNCHANGED FLOW)
 # ===============================================================
 def save_face_replace(user_id, user_type, b64):
-    img, _ = decode_image(b64)
-    emb, _ = extract_embedding_and_landmarks(img)
-    emb_list = emb.tolist()
+    return save_face_capture(user_id, user_type, capture_face(b64))
+
 
-    matches = search_similar_faces(emb_list, limit=5)
+def save_face_capture(user_id, user_type, capture):
+    emb, lm = capture.embedding, capture.landmarks
+
+    with stage("vector_search"):
+        matches = search_similar_faces(emb, limit=5)
     for m in matches:
         if m.get("score", 0.0) >= DUPLICATE_HIGH and m["user_id"] != user_id:
+            rejections.inc(reason="duplicate")
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail=f"Face already registered to user {m['user_id']}"
@@ -159,39 +399,38 @@ def save_face_replace(user_id, user_type, b64):
     vector_id = f"vec_{user_id}"
 
     try:
-        with client.start_session() as session:
-            with session.start_transaction():
-                old = get_face_by_user(user_id)
-                if old:
-                    delete_vector(old["vector_ref"], session=session)
-                    delete_face(old["_id"], session=session)
-
-                create_vector(vector_id, user_id, emb_list, session=session)
-
-                ok, buf = cv2.imencode(".jpg", img)
-                face_id = create_face_doc(
-                    user_id,
-                    user_type,
-                    buf.tobytes(),
-                    vector_id,
-                    session=session
-                )
+        with stage("db_commit"), vector_transaction() as session:
+            old = get_face_by_user(user_id)
+            if old:
+                delete_vector(old["vector_ref"], session=session)
+                delete_face(old["_id"], session=session)
+
+            create_vector(vector_id, user_id, emb, landmarks=lm, session=session)
+
+            face_id = create_face_doc(
+                user_id,
+                user_type,
+                capture_jpeg(capture),
+                vector_id,
+                session=session
+            )
 
-                col_map = {
-                    "STUDENT": "students",
-                    "ADMIN": "admins",
-                    "HOD": "hods",
-                    "SUPER_ADMIN": "superadmins"
-                }
-
-                db[col_map[user_type.upper()]].update_one(
-                    {"_id": user_id},
-                    {"$set": {
-                        "face_id": str(face_id),
-                        "updated_at": datetime.utcnow()
-                    }},
-                    session=session
-                )
+            col_map = {
+                "STUDENT": "students",
+                "ADMIN": "admins",
+                "HOD": "hods",
+                "SUPER_ADMIN": "superadmins"
+            }
+
+            db[col_map[user_type.upper()]].update_one(
+                {"_id": user_id},
+                {"$set": {
+                    "face_id": str(face_id),
+                    "updated_at": datetime.utcnow()
+                }},
+                session=session
+            )
+        template_cache.invalidate(user_id)
         return True
 
     except PyMongoError:
@@ -202,14 +441,20 @@ def save_face_replace(user_id, user_type, b64):
 
 
 # ===============================================================
-# VERIFY THEN REPLACE (UNCHANGED)
+# VERIFY THEN REPLACE
 # ===============================================================
-def verify_then_replace_face(user_id, user_type, b64):
+def verify_then_replace_face(user_id, user_type, b64=None, capture=None):
+    # One decode + one inference shared by verification, the duplicate
+    # search and the save (none at all for a validated face token)
+    if capture is None:
+        capture = capture_face(b64)
     try:
-        verify_face_for_user(user_id, b64)
-        save_face_replace(user_id, user_type, b64)
+        template = load_face_template(user_id)
     except HTTPException as e:
-        if e.status_code == 404:
-            save_face_replace(user_id, user_type, b64)
-        else:
+        if e.status_code != 404:
             raise
+        template = None  # first enrollment
+
+    if template is not None:
+        match_template(template, capture)
+    save_face_capture(user_id, user_type, capture)
@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+from fastapi import HTTPException
+
+from config import Config
+from utils.image_utils import laplacian_variance
+from services.face_service import (
+    decode_image_bytes,
+    run_face_detection,
+    run_face_analysis,
+    load_face_template,
+    match_template,
+    FaceCapture
+)
+from services.face_metrics import stream_frames
+from services.face_quality import frame_quality_issue
+
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _expand(box, margin, shape):
+    """Integer crop box grown by `margin` of its size, clipped to the frame."""
+    h, w = shape[:2]
+    bw, bh = box[2] - box[0], box[3] - box[1]
+    return (
+        max(0, int(box[0] - bw * margin)),
+        max(0, int(box[1] - bh * margin)),
+        min(w, int(box[2] + bw * margin)),
+        min(h, int(box[3] + bh * margin))
+    )
+
+
+# ===============================================================
+# STREAM SESSION (one per /face/verify/stream connection)
+# ===============================================================
+class FaceStreamSession:
+    """
+    Per-frame state machine for gate verification.
+
+    Every frame gets a detection-only pass, inside the tracked ROI when
+    there is one (bystanders behind the student are ignored). Recognition
+    runs only on steady, sharp, large-enough faces, and the session ends
+    on the first confident decision.
+    """
+
+    def __init__(self, user_id):
+        self.template = load_face_template(user_id)
+        self.roi = None        # last face box, frame coordinates
+        self.frames = 0
+        self.mismatches = 0
+        self.best_score = None
+        self.started = time.monotonic()
+
+    def expired(self):
+        return (
+            self.frames >= Config.FACE_STREAM_MAX_FRAMES
+            or time.monotonic() - self.started >= Config.FACE_STREAM_TIMEOUT_S
+        )
+
+    def _progress(self, reason):
+        return {"type": "progress", "frame": self.frames, "reason": reason}
+
+    def result(self, verified, reason=None, score=None):
+        if score is None:
+            score = self.best_score
+        return {
+            "type": "result",
+            "verified": verified,
+            "score": score,
+            "frames": self.frames,
+            "reason": reason,
+            "elapsed_ms": round((time.monotonic() - self.started) * 1000)
+        }
+
+    # -----------------------------------------------------------
+    # TRACKING + QUALITY GATE
+    # -----------------------------------------------------------
+    def _locate(self, img):
+        """(face box in frame coordinates, reason) for this frame."""
+        if self.roi is not None:
+            x1, y1, x2, y2 = _expand(self.roi, Config.FACE_STREAM_ROI_MARGIN, img.shape)
+            faces = run_face_detection(img[y1:y2, x1:x2], max_num=1, role="gate")
+            if faces:
+                box = faces[0].bbox + np.array([x1, y1, x1, y1], dtype=np.float32)
+                return box, faces[0].det_score, None
+
+        # Lost (or never had) the ROI: look at the whole frame
+        faces = run_face_detection(img, max_num=2, role="gate")
+        if not faces:
+            return None, 0.0, "no_face"
+        if len(faces) > 1:
+            return None, 0.0, "multiple_faces"
+        return faces[0].bbox, faces[0].det_score, None
+
+    def _gate(self, img, box, det_score):
+        previous, self.roi = self.roi, box
+
+        if det_score < Config.FACE_STREAM_MIN_DET_SCORE:
+            return "low_confidence"
+        if box[2] - box[0] < Config.FACE_STREAM_MIN_FACE_PX:
+            return "too_small"
+        if previous is None or _iou(previous, box) < Config.FACE_STREAM_MIN_IOU:
+            return "moving"
+
+        x1, y1, x2, y2 = _expand(box, 0.0, img.shape)
+        if laplacian_variance(img[y1:y2, x1:x2]) < Config.FACE_STREAM_MIN_SHARPNESS:
+            return "blurry"
+        return None
+
+    # -----------------------------------------------------------
+    # FRAME
+    # -----------------------------------------------------------
+    def process(self, data):
+        """One JPEG frame → a progress or a final result event."""
+        self.frames += 1
+        img, src = decode_image_bytes(data)
+
+        # Dark / overexposed frames are dropped before detection
+        reason = frame_quality_issue(img, src, "stream")
+        if not reason:
+            box, det_score, reason = self._locate(img)
+            if box is None:
+                self.roi = None
+            else:
+                reason = self._gate(img, box, det_score)
+        stream_frames.inc(outcome=reason or "recognized")
+        if reason:
+            return self.result(False, "timeout") if self.expired() else self._progress(reason)
+
+        # Recognition on the tracked ROI only
+        x1, y1, x2, y2 = _expand(box, Config.FACE_STREAM_ROI_MARGIN, img.shape)
+        faces = run_face_analysis(img[y1:y2, x1:x2], max_num=1, role="gate")
+        if not faces:
+            return self.result(False, "timeout") if self.expired() else self._progress("no_face")
+
+        face = faces[0]
+        # Crop pixels are fine: match_template aligns landmarks onto the template
+        lm = face.landmark_3d_68.astype(np.float32)
+        capture = FaceCapture(None, face.embedding.astype(np.float32), lm)
+
+        try:
+            ok, score = match_template(self.template, capture)
+        except HTTPException as e:
+            if e.status_code == 403:
+                return self.result(False, "ambiguous")
+            raise
+
+        score = float(score)
+        self.best_score = score if self.best_score is None else max(self.best_score, score)
+        if ok:
+            return self.result(True, score=score)
+
+        self.mismatches += 1
+        if self.mismatches >= Config.FACE_STREAM_REJECT_AFTER:
+            return self.result(False, "mismatch")
+        return self.result(False, "timeout") if self.expired() else self._progress("mismatch")
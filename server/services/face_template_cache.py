@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from pymongo.errors import PyMongoError
+
+from config import Config
+
+# Ready-to-score verification template for one user
+FaceTemplate = namedtuple("FaceTemplate", ["user_id", "vector_ref", "embedding", "landmarks"])
+
+
+class FaceTemplateCache:
+    """
+    Bounded LRU + TTL cache of FaceTemplate keyed by user_id.
+
+    Writers (face save / user delete) invalidate their own worker
+    directly; other workers are covered by the face_vectors change
+    stream watcher when available, and by the TTL otherwise.
+    """
+
+    def __init__(self, max_entries=Config.FACE_TEMPLATE_CACHE_SIZE,
+                 ttl_s=Config.FACE_TEMPLATE_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_vector = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, template = entry
+            if expires_at <= now:
+                self._drop(user_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return template
+
+    def put(self, template):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._drop(template.user_id)
+            self._entries[template.user_id] = (time.monotonic() + self.ttl_s, template)
+            self._by_vector[template.vector_ref] = template.user_id
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._by_vector.pop(entry[1].vector_ref, None)
+        return entry is not None
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._drop(user_id):
+                self.invalidations += 1
+
+    def invalidate_vector(self, vector_ref):
+        with self._lock:
+            user_id = self._by_vector.get(vector_ref)
+            if user_id is not None and self._drop(user_id):
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_vector.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+    # ------------------------------------------------------
+    # CROSS-WORKER INVALIDATION
+    # ------------------------------------------------------
+    def watch(self, collection):
+        """Drops templates whose face_vectors document changes anywhere."""
+        def run():
+            pipeline = [{"$project": {"documentKey": 1, "operationType": 1}}]
+            opened = False
+            while True:
+                try:
+                    with collection.watch(pipeline) as stream:
+                        opened = True
+                        # Anything cached before the stream opened may be stale
+                        self.clear()
+                        for change in stream:
+                            self.invalidate_vector(change["documentKey"]["_id"])
+                except PyMongoError as e:
+                    if not opened:
+                        print("[TEMPLATE-CACHE] No change streams, relying on TTL:", e)
+                        return
+                    print("[TEMPLATE-CACHE] Change stream failed:", e)
+                    time.sleep(5)
+
+        threading.Thread(target=run, name="face-template-watcher", daemon=True).start()
+
+
+template_cache = FaceTemplateCache()
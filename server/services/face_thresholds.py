@@ -0,0 +1,17 @@
+# ===============================================================
+# FACE MATCH THRESHOLDS
+# ===============================================================
+# Kept free of model / DB imports so offline jobs and benchmarks can
+# share the exact values used by the API.
+
+# 1:1 verification accepts cosine >= VERIFY_THRESHOLD; below
+# DUPLICATE_HIGH the landmark twin check also runs.
+VERIFY_THRESHOLD = 0.55
+
+# Enrollment rejects vector search scores >= DUPLICATE_HIGH
+DUPLICATE_HIGH = 0.65
+
+AMBIGUOUS_LOW = 0.50
+# L2 distance of the 68 3D landmarks, in template pixels, after the
+# capture's are aligned onto the template's (face_service.align_landmarks)
+LANDMARK_TWIN_THRESHOLD = 18.0
@@ -0,0 +1,207 @@
+"""
+Short-lived token → payload store for validated faces.
+
+Payloads are dicts of bytes fields. Every entry lives for the same TTL,
+so insertion order is expiry order: expiry and the memory cap both drop
+entries from the oldest end.
+
+    MemoryTokenStore   per worker, OrderedDict
+    SqliteTokenStore   one file shared by every worker on the host
+"""
+import os
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+def new_token():
+    return f"tmp_{secrets.token_urlsafe(24)}"
+
+
+def _payload_size(payload):
+    return sum(len(v) for v in payload.values())
+
+
+# ==========================================================
+# IN-PROCESS
+# ==========================================================
+class MemoryTokenStore:
+
+    def __init__(self, ttl_s=Config.FACE_TOKEN_TTL_S, max_bytes=Config.FACE_TOKEN_STORE_MAX_BYTES):
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # token -> (expires_at, size, payload)
+        self._bytes = 0
+
+    def _drop_oldest(self):
+        _, (_, size, _) = self._entries.popitem(last=False)
+        self._bytes -= size
+
+    def _expire(self, now):
+        while self._entries:
+            expires_at = next(iter(self._entries.values()))[0]
+            if expires_at > now:
+                break
+            self._drop_oldest()
+
+    def put(self, payload):
+        size = _payload_size(payload)
+        if size > self.max_bytes:
+            raise ValueError("Payload larger than the token store")
+
+        token = new_token()
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            while self._bytes + size > self.max_bytes:
+                self._drop_oldest()
+            self._entries[token] = (now + self.ttl_s, size, payload)
+            self._bytes += size
+        return token
+
+    def get(self, token):
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(token)
+            return entry[2] if entry else None
+
+    def pop(self, token):
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.pop(token, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[1]
+            return entry[2]
+
+
+# ==========================================================
+# SHARED (SQLite)
+# ==========================================================
+def _pack(payload):
+    parts = []
+    for key, value in payload.items():
+        k = key.encode()
+        parts.append(struct.pack("<HI", len(k), len(value)))
+        parts.append(k)
+        parts.append(bytes(value))
+    return b"".join(parts)
+
+
+def _unpack(blob):
+    payload = {}
+    pos = 0
+    mv = memoryview(blob)
+    while pos < len(mv):
+        klen, vlen = struct.unpack_from("<HI", mv, pos)
+        pos += 6
+        key = bytes(mv[pos:pos + klen]).decode()
+        pos += klen
+        payload[key] = bytes(mv[pos:pos + vlen])
+        pos += vlen
+    return payload
+
+
+class SqliteTokenStore:
+    """
+    Same contract as MemoryTokenStore, backed by a local SQLite file in
+    WAL mode so every uvicorn worker sees every token. Expiry uses the
+    wall clock since it is shared between processes.
+    """
+
+    def __init__(self, path, ttl_s=Config.FACE_TOKEN_TTL_S, max_bytes=Config.FACE_TOKEN_STORE_MAX_BYTES):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._db() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS face_tokens ("
+                " token TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS face_tokens_expiry ON face_tokens (expires_at)")
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def put(self, payload):
+        size = _payload_size(payload)
+        if size > self.max_bytes:
+            raise ValueError("Payload larger than the token store")
+
+        token = new_token()
+        now = time.time()
+        with self._db() as db:
+            db.execute("DELETE FROM face_tokens WHERE expires_at <= ?", (now,))
+            used = db.execute("SELECT COALESCE(SUM(size), 0) FROM face_tokens").fetchone()[0]
+            if used + size > self.max_bytes:
+                # Oldest first until the new entry fits
+                rows = db.execute("SELECT token, size FROM face_tokens ORDER BY expires_at").fetchall()
+                victims = []
+                for victim, victim_size in rows:
+                    if used + size <= self.max_bytes:
+                        break
+                    victims.append((victim,))
+                    used -= victim_size
+                db.executemany("DELETE FROM face_tokens WHERE token = ?", victims)
+            db.execute(
+                "INSERT INTO face_tokens (token, expires_at, size, payload) VALUES (?, ?, ?, ?)",
+                (token, now + self.ttl_s, size, _pack(payload))
+            )
+        return token
+
+    def get(self, token):
+        with self._db() as db:
+            row = db.execute(
+                "SELECT payload FROM face_tokens WHERE token = ? AND expires_at > ?",
+                (token, time.time())
+            ).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def pop(self, token):
+        with self._db() as db:
+            row = db.execute(
+                "DELETE FROM face_tokens WHERE token = ? RETURNING payload, expires_at",
+                (token,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return _unpack(row[0])
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE / COMMIT around a block (autocommit connection)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def create_token_store(path=Config.FACE_TOKEN_STORE_PATH):
+    if path:
+        return SqliteTokenStore(path)
+    return MemoryTokenStore()
@@ -1,41 +1,47 @@
-from datetime import datetime, timedelta
 from typing import Tuple, Optional
 from fastapi import HTTPException, status
 import numpy as np
-import cv2
 
 from services.face_service import (
-    decode_image,
-    extract_embedding_and_landmarks,
+    capture_face,
+    capture_jpeg,
+    FaceCapture,
     DUPLICATE_HIGH
 )
 
 from data.face_vectors_repo import search_similar_faces
+from data.vector_store import VectorStoreUnavailable
+from services.face_token_store import create_token_store
 
 # ==========================================================
-# TEMP CACHE (UNCHANGED)
+# TEMP STORE
 # ==========================================================
-FACE_CACHE = {}
-CACHE_EXPIRY_MINUTES = 5
+# token -> validated face (embedding, landmarks, encoded JPEG);
+# bounded, TTL'd, optionally shared by all workers on the host
+token_store = create_token_store()
 
 
-# ==========================================================
-# CACHE CLEANUP (UNCHANGED)
-# ==========================================================
-def cleanup_cache():
-    now = datetime.utcnow()
-    expired = [
-        k for k, v in FACE_CACHE.items()
-        if now - v["timestamp"] > timedelta(minutes=CACHE_EXPIRY_MINUTES)
-    ]
-    for k in expired:
-        del FACE_CACHE[k]
+def _pack_capture(capture):
+    return {
+        "embedding": np.ascontiguousarray(capture.embedding, dtype=np.float32).tobytes(),
+        "landmarks": np.ascontiguousarray(capture.landmarks, dtype=np.float32).tobytes(),
+        "jpeg": capture_jpeg(capture)
+    }
+
+
+def _unpack_capture(payload):
+    return FaceCapture(
+        None,
+        np.frombuffer(payload["embedding"], dtype=np.float32),
+        np.frombuffer(payload["landmarks"], dtype=np.float32).reshape(-1, 3),
+        payload["jpeg"]
+    )
 
 
 # ==========================================================
 # FACE VALIDATION (UPDATED SAFELY)
 # ==========================================================
-def validate_and_cache_face(image_b64: str) -> Tuple[bool, str]:
+def validate_and_cache_face(image_b64) -> Tuple[bool, str]:
     """
     Pre-validates face before registration.
 
@@ -43,20 +49,21 @@ def validate_and_cache_face(image_b64: str) -> Tuple[bool, str]:
     - Exactly one face
     - Valid embedding extraction
     - No global duplicate face
-    """
-
-    cleanup_cache()
 
-    img, _ = decode_image(image_b64)
+    The returned token carries the embedding, landmarks and JPEG so
+    registration can commit without running inference again.
+    """
 
     # 🚨 This now enforces:
     # - No face
     # - Multiple faces
-    emb, _ = extract_embedding_and_landmarks(img)
-    emb_list = emb.tolist()
+    capture = capture_face(image_b64)
 
     try:
-        matches = search_similar_faces(emb_list, limit=5)
+        matches = search_similar_faces(capture.embedding, limit=5)
+    except VectorStoreUnavailable:
+        # Gallery still loading: the global handler answers 503
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,18 +77,43 @@ def validate_and_cache_face(image_b64: str) -> Tuple[bool, str]:
                 detail=f"Face already registered to user {m['user_id']}"
             )
 
-    token = f"tmp_{datetime.utcnow().timestamp()}"
-    FACE_CACHE[token] = {
-        "image_b64": image_b64,
-        "timestamp": datetime.utcnow()
-    }
+    token = token_store.put(_pack_capture(capture))
 
     return True, token
 
 
 # ==========================================================
-# GET CACHED FACE (UNCHANGED)
+# GET CACHED FACE
 # ==========================================================
-def get_cached_face(temp_token: str) -> Optional[str]:
-    cleanup_cache()
-    return FACE_CACHE.get(temp_token, {}).get("image_b64")
+def get_cached_face(temp_token: str) -> Optional[FaceCapture]:
+    payload = token_store.get(temp_token)
+    return _unpack_capture(payload) if payload else None
+
+
+def consume_cached_face(temp_token: str) -> Optional[FaceCapture]:
+    """Like get_cached_face, but a token can only be registered once."""
+    payload = token_store.pop(temp_token)
+    return _unpack_capture(payload) if payload else None
+
+
+def resolve_face_capture(image_b64=None, face_token: Optional[str] = None) -> FaceCapture:
+    """
+    Face for a registration request: a validated token when given
+    (no inference), otherwise the uploaded image (base64 or bytes).
+    """
+    if face_token:
+        capture = consume_cached_face(face_token)
+        if capture is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Face token expired or invalid. Please validate again."
+            )
+        return capture
+
+    if image_b64:
+        return capture_face(image_b64)
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="image_b64 or face_token is required"
+    )
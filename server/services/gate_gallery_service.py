@@ -0,0 +1,258 @@
+import threading
+import time
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from config import Config
+from data.requests_repo import get_approved_requests_for_guard_college
+from data.guards_repo import get_guard_by_id
+from data.embedding_codec import normalize
+from services.face_service import load_face_template, match_template
+from services.face_metrics import match_scores, decisions
+from services.face_thresholds import VERIFY_THRESHOLD
+from utils.time_utils import ist_now
+
+
+# ===============================================================
+# GALLERY (one per college)
+# ===============================================================
+class GateGallery:
+    """
+    Embeddings of the students with an APPROVED request for one college,
+    i.e. everyone the gate may let out right now. Small enough that
+    identification is one matrix-vector product.
+    """
+
+    def __init__(self, college):
+        self.college = college
+        self.day = ist_now().date()
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.request_ids = []
+        self.templates = []
+        self.matrix = np.zeros((0, Config.FACE_VECTOR_DIM), dtype=np.float32)
+
+    def build(self):
+        request_ids, templates = [], []
+        for req in get_approved_requests_for_guard_college(self.college):
+            template = self._template(req["student_id"])
+            if template is not None:
+                request_ids.append(str(req["_id"]))
+                templates.append(template)
+
+        with self._lock:
+            self.request_ids = request_ids
+            self.templates = templates
+            self.matrix = self._stack(templates)
+        return self
+
+    @staticmethod
+    def _template(student_id):
+        try:
+            return load_face_template(student_id)
+        except HTTPException:
+            # No face enrolled: the guard falls back to the request list
+            return None
+
+    @staticmethod
+    def _stack(templates):
+        if not templates:
+            return np.zeros((0, Config.FACE_VECTOR_DIM), dtype=np.float32)
+        return np.vstack([t.embedding for t in templates]).astype(np.float32)
+
+    def expired(self):
+        """Built on an earlier day: unusable, requests are per day."""
+        return self.day != ist_now().date()
+
+    def stale(self):
+        """Due for a refresh (TTL or a missed update); still usable meanwhile."""
+        return time.monotonic() - self.built_at > Config.FACE_GATE_GALLERY_TTL_S
+
+    def invalidate(self):
+        self.built_at = float("-inf")
+
+    # -----------------------------------------------------------
+    # INCREMENTAL UPDATES
+    # -----------------------------------------------------------
+    def add(self, request_id, student_id):
+        template = self._template(student_id)
+        if template is None:
+            return
+        with self._lock:
+            if request_id in self.request_ids:
+                return
+            self.request_ids.append(request_id)
+            self.templates.append(template)
+            self.matrix = np.vstack([self.matrix, template.embedding[None, :]])
+
+    def remove(self, request_id):
+        with self._lock:
+            if request_id not in self.request_ids:
+                return
+            i = self.request_ids.index(request_id)
+            del self.request_ids[i]
+            del self.templates[i]
+            self.matrix = np.delete(self.matrix, i, axis=0)
+
+    # -----------------------------------------------------------
+    # IDENTIFY
+    # -----------------------------------------------------------
+    def identify(self, capture):
+        """
+        (request_id, template, score, runner_up) of the best match for
+        `capture`, or None when the gallery is empty.
+        """
+        with self._lock:
+            matrix, request_ids, templates = self.matrix, self.request_ids, self.templates
+        if not request_ids:
+            return None
+
+        scores = matrix @ normalize(capture.embedding)
+        order = np.argsort(scores)[::-1][:2]
+        best = int(order[0])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else None
+        return request_ids[best], templates[best], float(scores[best]), runner_up
+
+
+# ===============================================================
+# REGISTRY (college → gallery)
+# ===============================================================
+class GateGalleryRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._galleries = {}
+        self._build_locks = {}   # college → held while that gallery is (re)built
+
+    def _cached(self, college):
+        with self._lock:
+            return (
+                self._galleries.get(college),
+                self._build_locks.setdefault(college, threading.Lock())
+            )
+
+    def _build(self, college):
+        gallery = GateGallery(college).build()
+        with self._lock:
+            self._galleries[college] = gallery
+        return gallery
+
+    def get(self, college):
+        """
+        The college's gallery. Only a missing or previous-day gallery is
+        built inside the request (once, however many guards ask); a
+        stale one is served while a background thread rebuilds it.
+        """
+        gallery, build_lock = self._cached(college)
+        if gallery is None or gallery.expired():
+            with build_lock:
+                gallery, _ = self._cached(college)
+                if gallery is None or gallery.expired():
+                    gallery = self._build(college)
+            return gallery
+
+        if gallery.stale() and build_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._rebuild,
+                args=(college, build_lock),
+                name=f"gate-gallery-{college}",
+                daemon=True
+            ).start()
+        return gallery
+
+    def _rebuild(self, college, build_lock):
+        try:
+            self._build(college)
+        except Exception as e:
+            print(f"[GATE-GALLERY] Rebuild failed ({college}):", e)
+        finally:
+            build_lock.release()
+
+    # Called after the request's transaction has committed: a failure
+    # here must not turn that into an error, so the gallery is only
+    # marked for a rebuild
+    def on_request_approved(self, request):
+        with self._lock:
+            gallery = self._galleries.get(request.get("college"))
+        if gallery is not None:
+            try:
+                gallery.add(str(request["_id"]), request["student_id"])
+            except Exception as e:
+                print("[GATE-GALLERY] Update failed, rebuilding:", e)
+                gallery.invalidate()
+
+    def on_request_closed(self, request):
+        """Marked left (or otherwise no longer APPROVED)."""
+        with self._lock:
+            gallery = self._galleries.get(request.get("college"))
+        if gallery is not None:
+            try:
+                gallery.remove(str(request["_id"]))
+            except Exception as e:
+                print("[GATE-GALLERY] Update failed, rebuilding:", e)
+                gallery.invalidate()
+
+    def stats(self):
+        with self._lock:
+            return {
+                college: len(g.request_ids)
+                for college, g in self._galleries.items()
+            }
+
+
+gate_galleries = GateGalleryRegistry()
+
+
+# ===============================================================
+# SERVICE
+# ===============================================================
+def identify_at_gate(guard_id, capture):
+    guard = get_guard_by_id(guard_id)
+    if not guard or not guard.get("college"):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Guard has no college assigned")
+
+    gallery = gate_galleries.get(guard["college"])
+    hit = gallery.identify(capture)
+    if hit is None:
+        result = {"matched": False, "reason": "no_approved_requests", "gallery_size": 0}
+    else:
+        match_scores.observe(hit[2], kind="identify")
+        result = _match_result(gallery, hit, capture)
+    decisions.inc(kind="identify", result="match" if result["matched"] else result["reason"])
+    return result
+
+
+def _match_result(gallery, hit, capture):
+    request_id, template, score, runner_up = hit
+    result = {
+        "matched": False,
+        "score": score,
+        "gallery_size": len(gallery.request_ids)
+    }
+
+    if score < VERIFY_THRESHOLD:
+        result["reason"] = "no_match"
+        return result
+    if runner_up is not None and score - runner_up < Config.FACE_IDENTIFY_MIN_MARGIN:
+        result["reason"] = "ambiguous"
+        return result
+
+    # Same 1:1 decision (incl. the twin/spoof landmark check) as /face/verify
+    try:
+        ok, _ = match_template(template, capture)
+    except HTTPException as e:
+        if e.status_code == 403:
+            result["reason"] = "ambiguous"
+            return result
+        raise
+    if not ok:
+        result["reason"] = "no_match"
+        return result
+
+    result.update({
+        "matched": True,
+        "student_id": template.user_id,
+        "request_id": request_id
+    })
+    return result
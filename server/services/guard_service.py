@@ -15,7 +15,8 @@ from data.guards_repo import (
 
 from data.roles_repo import get_role_by_name
 from data.faces_repo import get_face_by_user, delete_face
-from data.face_vectors_repo import delete_vector
+from data.face_vectors_repo import delete_vector, vector_transaction
+from services.face_template_cache import template_cache
 
 from extensions.mongo import client, db
 from core.global_response import success
@@ -104,16 +105,15 @@ def delete_guard_service(guard_id):
     face_id = old.get("_id") if old else None
 
     try:
-        with client.start_session() as s:
-            with s.start_transaction():
+        with vector_transaction() as s:
 
-                if vec:
-                    delete_vector(vec, session=s)
-                if face_id:
-                    delete_face(face_id, session=s)
+            if vec:
+                delete_vector(vec, session=s)
+            if face_id:
+                delete_face(face_id, session=s)
 
-                repo_delete_guard(guard_id)
-                db["user_roles"].delete_many({"user_id": guard_id}, session=s)
+            repo_delete_guard(guard_id)
+            db["user_roles"].delete_many({"user_id": guard_id}, session=s)
 
     except PyMongoError:
         raise HTTPException(
@@ -121,6 +121,7 @@ def delete_guard_service(guard_id):
             detail="Failed to delete guard"
         )
 
+    template_cache.invalidate(guard_id)
     return success("Guard deleted successfully")
 
 
@@ -22,7 +22,8 @@ from data.student_hod_repo import (
 
 from data.roles_repo import get_role_by_name
 from data.faces_repo import get_face_by_user, delete_face
-from data.face_vectors_repo import delete_vector
+from data.face_vectors_repo import delete_vector, vector_transaction
+from services.face_template_cache import template_cache
 
 from extensions.mongo import client, db
 from services.validators import validate_college
@@ -173,8 +174,7 @@ def delete_hod_service(hod_id):
     face_id = old.get("_id") if old else None
 
     try:
-        with client.start_session() as s:
-           with s.start_transaction():
+        with vector_transaction() as s:
             if vec: delete_vector(vec, session=s)
             if face_id: delete_face(face_id, session=s)
 
@@ -185,6 +185,7 @@ def delete_hod_service(hod_id):
     except PyMongoError:
         raise HTTPException(status_code=500, detail="Failed to delete HOD")
 
+    template_cache.invalidate(hod_id)
     delete_hod_mappings(hod_id)
     return success("HOD deleted successfully")
 
@@ -32,6 +32,7 @@ from data.faces_repo import get_face_by_user
 from data.mentor_assignment_repo import get_assignments_for_student
 from data.batch_rule_repo import get_batch_for_student
 from data.mentor_repo import get_mentor_by_id
+from services.gate_gallery_service import gate_galleries
 
 
 # ==========================================================
@@ -265,6 +266,8 @@ def approve_request(request_id, hod_id, hod_name):
                 updated = get_request_by_id(request_id)
                 updated = _clean_request(updated)  # ✅ FIX
 
+        # Student can now be identified at the gate (/face/identify)
+        gate_galleries.on_request_approved(updated)
         return success("Request approved", updated)
 
     except Exception:
@@ -395,6 +398,8 @@ def mark_left(request_id):
                 updated = get_request_by_id(request_id)
                 updated = _clean_request(updated)  # ✅ FIX
 
+        if updated:
+            gate_galleries.on_request_closed(updated)
         return success("Student marked as left campus", updated)
 
     except PyMongoError:
@@ -1,4 +1,3 @@
-import cv2
 from datetime import datetime
 from pymongo.errors import PyMongoError
 from fastapi import HTTPException, status
@@ -17,12 +16,14 @@ from data.student_repo import (
 
 from data.roles_repo import get_role_by_name
 from data.faces_repo import get_face_by_user, delete_face, create_face_doc
-from data.face_vectors_repo import create_vector, delete_vector, search_similar_faces
+from data.face_vectors_repo import create_vector, delete_vector, search_similar_faces, vector_transaction
 from data.student_hod_repo import map_student_to_hod, delete_student_mappings
 from data.hod_repo import get_all_hods
 from extensions.mongo import client, db
 from services.validators import validate_college
-from services.face_service import decode_image, extract_embedding_and_landmarks, DUPLICATE_HIGH
+from services.face_service import capture_jpeg, DUPLICATE_HIGH
+from services.face_validation_service import resolve_face_capture
+from services.face_template_cache import template_cache
 from core.global_response import success
 
 # ==========================================================
@@ -108,31 +109,31 @@ def register_student(student_id, name, phone, admission_year, current_semester,
 # ==========================================================
 # REGISTER FACE
 # ==========================================================
-def register_student_face_service(student_id: str, image_b64: str):
+def register_student_face_service(student_id: str, image_b64: str = None, face_token: str = None):
     student = repo_get_student_by_id(student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     if student.get("face_id"):
         raise HTTPException(status_code=409, detail="Face already registered")
 
-    img, _ = decode_image(image_b64)
-    emb, _, _ = extract_embedding_and_landmarks(img)
-    emb_list = emb.tolist()
-    matches = search_similar_faces(emb_list)
+    capture = resolve_face_capture(image_b64, face_token)
+    emb, lm = capture.embedding, capture.landmarks
+    # Repeated even for a validated token: another face may have been
+    # enrolled since (no inference, just the vector search)
+    matches = search_similar_faces(emb)
     for m in matches:
         if m["score"] >= DUPLICATE_HIGH:
             raise HTTPException(status_code=409, detail=f"Duplicate face detected")
 
     vector_id = f"vec_{student_id}"
     try:
-        with client.start_session() as s:
-            with s.start_transaction():
-                create_vector(vector_id, student_id, emb_list, session=s)
-                ok, buf = cv2.imencode(".jpg", img)
-                face_id = create_face_doc(student_id, "STUDENT", buf.tobytes(), vector_id, session=s)
-                db["students"].update_one({"_id": student_id}, {"$set": {"face_id": face_id}}, session=s)
+        with vector_transaction() as s:
+            create_vector(vector_id, student_id, emb, landmarks=lm, session=s)
+            face_id = create_face_doc(student_id, "STUDENT", capture_jpeg(capture), vector_id, session=s)
+            db["students"].update_one({"_id": student_id}, {"$set": {"face_id": face_id}}, session=s)
     except PyMongoError:
         raise HTTPException(status_code=500, detail="Face registration failed")
+    template_cache.invalidate(student_id)
     return success("Face registered successfully")
 
 # ==========================================================
@@ -189,8 +190,7 @@ def update_student_service(student_id, updates):
 def delete_student_service(student_id):
     face = get_face_by_user(student_id)
     try:
-        with client.start_session() as s:
-          with s.start_transaction():
+        with vector_transaction() as s:
             if face:
                 if face.get("vector_ref"):
                     delete_vector(face["vector_ref"], session=s)
@@ -202,6 +202,7 @@ def delete_student_service(student_id):
 
     except PyMongoError:
         raise HTTPException(status_code=500, detail="Delete failed")
+    template_cache.invalidate(student_id)
     delete_student_mappings(student_id)
     return success("Student deleted successfully")
 
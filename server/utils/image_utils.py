@@ -0,0 +1,84 @@
+import struct
+
+import cv2
+
+# JPEG start-of-frame markers that carry the frame size
+# (C4 = DHT, C8 = JPG extension, CC = DAC are not frames)
+_JPEG_SOF = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# cv2.imread flags for libjpeg's scaled (DCT-domain) decoding
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+def read_image_header(buf):
+    """
+    Returns (format, width, height) from a JPEG / PNG header without
+    decoding pixels, or None for other / malformed data.
+    """
+    mv = memoryview(buf)
+
+    if bytes(mv[:8]) == _PNG_SIGNATURE:
+        if len(mv) < 24 or bytes(mv[12:16]) != b"IHDR":
+            return None
+        width, height = struct.unpack(">II", mv[16:24])
+        return "png", width, height
+
+    if bytes(mv[:2]) != b"\xff\xd8":
+        return None
+
+    pos = 2
+    n = len(mv)
+    while pos + 4 <= n:
+        if mv[pos] != 0xFF:
+            return None
+        marker = mv[pos + 1]
+        if marker == 0xFF:          # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2                # standalone markers, no length
+            continue
+        if marker == 0xDA:          # start of scan before any frame
+            return None
+
+        (length,) = struct.unpack(">H", mv[pos + 2:pos + 4])
+        if marker in _JPEG_SOF:
+            if pos + 9 > n:
+                return None
+            height, width = struct.unpack(">HH", mv[pos + 5:pos + 9])
+            return "jpeg", width, height
+        pos += 2 + length
+
+    return None
+
+
+def reduction_factor(width, height, min_side):
+    """Largest libjpeg reduction that keeps the long side >= min_side."""
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= min_side:
+            return factor
+    return 1
+
+
+def laplacian_variance(img):
+    """Focus measure: variance of the Laplacian of the grayscale image."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def gray_preview(img, max_side):
+    """Small grayscale copy: long side at most `max_side`, area-averaged."""
+    h, w = img.shape[:2]
+    f = max_side / max(h, w)
+    if f < 1:
+        img = cv2.resize(img, (max(1, round(w * f)), max(1, round(h * f))), interpolation=cv2.INTER_AREA)
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)